@@ -1,11 +1,40 @@
+import importlib
 
-from filter_tree.tree.model import FilterModel
-from filter_tree.tree.item import FilterItem
-from filter_tree.tree.delegates import PreProcessedDelegate, PostProcessedDelegate, SavingDelegate
-from filter_tree.parameter.model import ParameterModel
-from filter_tree.parameter.item import ParameterItem
-from filter_tree.parameter.delegates import ParameterDelegate
-from filter_tree.save.model import SaveModel
-from filter_tree.save.item import SaveItem
-from filter_tree.save.delegates import SaveDelegate
-from filter_tree.codec import load, loads, dump, dumps
+#Exports are resolved on first access, so importing the package (or one
+#of its submodules, e.g. the codec) doesn't import all models and widgets
+_EXPORTS = {
+    'FilterModel': 'tree.model',
+    'FilterItem': 'tree.item',
+    'ParameterModel': 'parameters.model',
+    'ParameterView': 'parameters.widget',
+    'SaveModel': 'save_info.model',
+    'Save': 'save_info.item',
+    'SaveView': 'save_info.widgets',
+    'SaveControls': 'save_info.widgets',
+    'SaveWriter': 'save_info.writer',
+    'PlanCompiler': 'processing.plan',
+    'Executor': 'processing.executor',
+    'ThreadedExecutor': 'processing.executor',
+    'registry': 'filters.registry',
+    'load': 'codec',
+    'loads': 'codec',
+    'dump': 'codec',
+    'dumps': 'codec',
+}
+
+__all__ = list(_EXPORTS.keys())
+
+
+def __getattr__(name):
+    if name in _EXPORTS.keys():
+        #The modules import each other by these absolute names, importing
+        #them relative to the package would create second copies
+        module = importlib.import_module(_EXPORTS[name])
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
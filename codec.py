@@ -1,14 +1,20 @@
 
 import json
 
-from tree import FilterTree
+from filters.registry import FilterRef, toRef
 
 
 class TreeJSONEncoder(json.JSONEncoder):
-
+    """
+    Encodes items and models by their `serialize()` representation and
+    filter functions by their import path. No Qt modules are imported,
+    so the codec can be used in batch workers without a GUI. 
+    """
     def default(self, obj):
-        if isinstance(obj, FilterTree):
-            return repr(obj)
+        if hasattr(obj, 'serialize') and callable(obj.serialize):
+            return obj.serialize()
+        if isinstance(obj, FilterRef) or callable(obj):
+            return toRef(obj)
         return super().default(obj)
 
 
@@ -27,7 +33,7 @@ def dumps(obj, cls=TreeJSONEncoder, allow_nan=False, **kwargs):
 def load(fp,
          cls=json.JSONDecoder,
          parse_constant=_enforce_strict_numbers,
-         object_hook=FilterTree.toInstance,
+         object_hook=None,
          **kwargs):
     return json.load(fp,
                      cls=cls, object_hook=object_hook,
@@ -38,7 +44,7 @@ def load(fp,
 def loads(s,
           cls=json.JSONDecoder,
           parse_constant=_enforce_strict_numbers,
-          object_hook=FilterTree.toInstance,
+          object_hook=None,
           **kwargs):
     return json.loads(s,
                       cls=cls, object_hook=object_hook,
@@ -0,0 +1,5 @@
+from filters.capabilities import ArraySpec, FilterCapabilities, declareCapabilities
+from filters.registry import FilterRef, FilterRegistry, registry, toRef, makeRef, resolveFunction, getCapabilities
+
+__all__ = [FilterRef, FilterRegistry, registry, toRef, makeRef, resolveFunction, 
+    ArraySpec, FilterCapabilities, declareCapabilities, getCapabilities]
@@ -0,0 +1,152 @@
+import numpy as np
+
+
+class ArraySpec:
+    """
+    The `ArraySpec` describes an array by its shape and dtype, without
+    any data. Specs predicted from undeclared filters aren't `exact`.
+    """
+    def __init__(self, shape, dtype, exact=True):
+        if isinstance(shape, int):
+            shape = (shape,)
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = np.dtype(dtype)
+        self.exact = exact
+
+    @classmethod
+    def fromValue(cls, value, exact=True):
+        """ 
+        Create a spec from an `ArraySpec`, a (shape, dtype) tuple or an
+        array. The result is only `exact` if both `value` and `exact` are.
+        """
+        if isinstance(value, ArraySpec):
+            return cls(value.shape, value.dtype, exact=value.exact and exact)
+        elif isinstance(value, np.ndarray):
+            return cls(value.shape, value.dtype, exact=exact)
+        elif isinstance(value, (tuple, list)) and len(value) == 2:
+            return cls(value[0], value[1], exact=exact)
+        raise TypeError("Cannot create an array spec from {!r}!".format(value))
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def downsampled(self, factor):
+        """ Return the spec of the array downsampled by `factor` along its first two axes. """
+        if factor == 1:
+            return self
+        shape = tuple(n // factor if axis < 2 else n for axis, n in enumerate(self.shape))
+        return ArraySpec(shape, self.dtype, exact=self.exact)
+
+    def __eq__(self, other):
+        return isinstance(other, ArraySpec) and other.shape == self.shape and other.dtype == self.dtype
+
+    def __repr__(self):
+        return "ArraySpec({}, {}{})".format(self.shape, self.dtype, "" if self.exact else ", exact=False")
+
+
+class FilterCapabilities:
+    """
+    The `FilterCapabilities` declare how a filter function may be
+    scheduled. The defaults are conservative, i.e. they are correct for
+    any filter, but prevent all optimizations.
+
+    Attributes
+    ----------
+    thread_safe : bool
+        The function may run concurrently in several threads of the
+        same process.
+    releases_gil : bool
+        The function spends most of its time with the GIL released
+        (e.g. in numpy or OpenCV), so running it in a thread is as fast
+        as running it in a process, without copying any data.
+    in_place : bool
+        The function tolerates its output aliasing its input, i.e. the
+        array returned by `context.empty_like(image)` may be `image`
+        itself if no other item uses it.
+    tiles : bool
+        The function can process tiles of the image independently.
+        Otherwise it needs the whole image.
+    halo : int
+        The number of pixels a tile must overlap its neighbours, e.g.
+        the radius of a kernel. Only used if `tiles` is True.
+    memory_factor : float
+        The peak memory used by the function as a multiple of the size
+        of its input, including the output.
+    max_concurrency : int
+        The maximum number of concurrent calls of the function, e.g.
+        for filters using a GPU or many threads themselves. None for
+        no limit.
+    output_spec : callable or str
+        The function predicting the `ArraySpec` of the filter's output
+        without computing it, or its import path "module:qualname". It
+        is called as `output_spec(input_spec, **params)` for filters and
+        `output_spec(**params)` for inputs, and may return an `ArraySpec`
+        or a (shape, dtype) tuple, or raise a ValueError for parameters
+        the filter can't be run with. If None, filters are assumed to 
+        preserve the shape and dtype of their input.
+    """
+    NAMES = ['thread_safe', 'releases_gil', 'in_place', 'tiles', 'halo', 'memory_factor', 'max_concurrency',
+             'output_spec']
+
+    def __init__(self, thread_safe=False, releases_gil=False, in_place=False, tiles=False, halo=0,
+                 memory_factor=2.0, max_concurrency=None, output_spec=None):
+        if memory_factor <= 0:
+            raise ValueError("Memory factor must be positive, not {}!".format(memory_factor))
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("Maximum concurrency must be at least 1, not {}!".format(max_concurrency))
+        self.thread_safe = bool(thread_safe)
+        self.releases_gil = bool(releases_gil)
+        self.in_place = bool(in_place)
+        self.tiles = bool(tiles)
+        self.halo = int(halo)
+        self.memory_factor = float(memory_factor)
+        self.max_concurrency = max_concurrency
+        self.output_spec = output_spec
+
+    @classmethod
+    def fromDict(cls, dictionary):
+        """ Create capabilities from a dict of attribute name:value pairs. """
+        if isinstance(dictionary, cls):
+            return dictionary
+        unknown = [name for name in dictionary.keys() if not name in cls.NAMES]
+        if len(unknown) > 0:
+            raise KeyError("Unknown filter capabilities: {}".format(", ".join(unknown)))
+        return cls(**dictionary)
+
+    def toDict(self):
+        return {name: getattr(self, name) for name in self.NAMES}
+
+    def runsInThread(self):
+        """ Return True if the function is best run in a thread rather than a process. """
+        return self.thread_safe and self.releases_gil
+
+    def __eq__(self, other):
+        return isinstance(other, FilterCapabilities) and other.toDict() == self.toDict()
+
+    def __repr__(self):
+        return "FilterCapabilities({})".format(", ".join("{}={!r}".format(k, v) for k, v in self.toDict().items()))
+
+
+#Numpy releases the GIL for the arithmetic of `combine()`
+COMBINE_CAPABILITIES = FilterCapabilities(thread_safe=True, releases_gil=True, tiles=True, memory_factor=3.0)
+#Stretching needs the minimum and maximum of the whole result
+COMBINE_STRETCH_CAPABILITIES = FilterCapabilities(thread_safe=True, releases_gil=True, memory_factor=3.0)
+
+
+def declareCapabilities(**kwargs):
+    """
+    Decorator declaring the `FilterCapabilities` of a filter function,
+    e.g.
+
+        @declareCapabilities(thread_safe=True, releases_gil=True, in_place=True)
+        def invert(image, context=None):
+            ...
+
+    Capabilities given when registering the filter take precedence.
+    """
+    capabilities = FilterCapabilities(**kwargs)
+    def decorate(fn):
+        fn.filter_capabilities = capabilities
+        return fn
+    return decorate
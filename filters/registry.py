@@ -0,0 +1,307 @@
+import copy
+import importlib
+import sys
+import threading
+import types
+
+from filters.capabilities import FilterCapabilities
+
+
+class FilterRef:
+    """
+    A `FilterRef` references a filter function by its import path 
+    "module:qualname". The module is only imported when the function
+    is resolved, i.e. on the first call, and the function is cached 
+    from then on. 
+
+    References compare equal if their paths are equal, so they can be
+    used as keys regardless of whether the function was resolved yet.
+    """
+    def __init__(self, ref):
+        """
+        Initialize the `FilterRef`.
+
+        Parameters
+        ----------
+        ref : str
+            The import path, e.g. "numpy:clip" or "filters.blur:gaussian"
+        """
+        if not isinstance(ref, str):
+            raise TypeError("Filter references must be passed as string, not {}!".format(type(ref)))
+        module, sep, qualname = ref.partition(':')
+        if not sep or not module or not qualname:
+            raise ValueError("Invalid filter reference, expected 'module:qualname': {}".format(ref))
+        self.ref = ref
+        self.module = module
+        self.qualname = qualname
+        self._fn = None
+
+    @classmethod
+    def fromFunction(cls, fn):
+        """ Create a reference to the importable function `fn`. """
+        ref = cls(toRef(fn))
+        ref._fn = fn
+        return ref
+
+    def isResolved(self):
+        return self._fn is not None
+
+    def resolve(self):
+        """ Import and return the referenced function. """
+        fn = self._fn
+        if fn is None:
+            with _import_lock:
+                obj = importlib.import_module(self.module)
+                for name in self.qualname.split('.'):
+                    obj = getattr(obj, name)
+            if not callable(obj):
+                raise TypeError("Filter reference {} is not callable!".format(self.ref))
+            fn = self._fn = obj
+        return fn
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __reduce__(self):
+        #Only the path is pickled, the receiver imports the function lazily
+        return (FilterRef, (self.ref,))
+
+    def __eq__(self, other):
+        return isinstance(other, FilterRef) and other.ref == self.ref
+
+    def __hash__(self):
+        return hash(self.ref)
+
+    def __repr__(self):
+        return "FilterRef({!r})".format(self.ref)
+
+    def __str__(self):
+        return self.ref
+
+
+class FilterRegistry:
+    """
+    The `FilterRegistry` maps filter names to the import paths of their
+    functions and their parameter schemas, so that a filter library can
+    be made available without importing any of it. Modules are only 
+    imported once a filter is executed. 
+
+    Filters may be registered with their `FilterCapabilities`, which 
+    are then known to the executors without importing the filter.
+    """
+    def __init__(self):
+        self._filters = {}
+        self._capabilities = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, fn, params={}, description='', capabilities=None):
+        """
+        Register a filter. 
+
+        Parameters
+        ----------
+        name : str
+            The unique filter name
+        fn : str or callable
+            The filter function, either as import path "module:qualname"
+            or as the (importable) function itself
+        params : dict
+            The filter's parameters, as passed to 
+            <filter_tree.parameters.model.ParameterModel.createModel>
+        description : str
+            A short description of the filter
+        capabilities : dict or FilterCapabilities
+            The capabilities of the filter function. If None, the 
+            capabilities declared on the function are used.
+        """
+        if not isinstance(name, str):
+            raise TypeError("Filter names must be passed as string, not {}!".format(type(name)))
+        if not isinstance(params, dict):
+            raise TypeError("Filter parameters must be passed as dict, not {}!".format(type(params)))
+        if isinstance(fn, FilterRef):
+            ref = fn
+        elif isinstance(fn, str):
+            ref = FilterRef(fn)
+        else:
+            ref = FilterRef.fromFunction(fn)
+        if capabilities is not None:
+            capabilities = FilterCapabilities.fromDict(capabilities)
+
+        with self._lock:
+            if name in self._filters.keys():
+                raise ValueError("A filter named {} is already registered!".format(name))
+            self._filters[name] = {
+                'ref': ref,
+                'params': copy.deepcopy(params),
+                'description': description,
+                'capabilities': capabilities,
+            }
+            if capabilities is not None:
+                self._capabilities[ref] = capabilities
+
+    def unregister(self, name):
+        with self._lock:
+            entry = self._filters.pop(name, None)
+            if entry is not None and entry['capabilities'] is not None:
+                self._capabilities.pop(entry['ref'], None)
+
+    def names(self):
+        """ Return the names of all registered filters. """
+        with self._lock:
+            return list(self._filters.keys())
+
+    def getFunction(self, name):
+        """ Return the `FilterRef` of the filter `name`. """
+        return self._get(name)['ref']
+
+    def getParams(self, name):
+        """ Return a copy of the parameter schema of the filter `name`. """
+        return copy.deepcopy(self._get(name)['params'])
+
+    def getDescription(self, name):
+        return self._get(name)['description']
+
+    def getCapabilities(self, name):
+        """ 
+        Return the `FilterCapabilities` the filter `name` was registered 
+        with, or None. 
+        """
+        return self._get(name)['capabilities']
+
+    def findCapabilities(self, ref):
+        """ 
+        Return the `FilterCapabilities` registered for the function
+        referenced by the `FilterRef` `ref`, or None. 
+        """
+        with self._lock:
+            return self._capabilities.get(ref)
+
+    def getItemDict(self, name):
+        """
+        Return a dict describing a filter item for the filter `name`, 
+        to be passed to <filter_tree.tree.item.FilterItem.createItem>.
+        """
+        entry = self._get(name)
+        return {
+            'type': 'filter',
+            'name': name,
+            'description': entry['description'],
+            'fn': entry['ref'].ref,
+            'param_model': copy.deepcopy(entry['params']),
+        }
+
+    def _get(self, name):
+        with self._lock:
+            if not name in self._filters.keys():
+                raise KeyError("No filter named {} is registered!".format(name))
+            return self._filters[name]
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._filters.keys()
+
+    def __len__(self):
+        return len(self._filters)
+
+
+_import_lock = threading.RLock()
+
+registry = FilterRegistry()
+
+
+def toRef(fn, strict=True):
+    """
+    Return the import path "module:qualname" of `fn`. 
+
+    Parameters
+    ----------
+    fn : callable, str, FilterRef or None
+        The function. Strings are returned unchanged, None stays None.
+    strict : bool
+        If False, functions that cannot be imported by path (e.g. 
+        lambdas, nested functions or methods bound to an instance) are
+        returned unchanged instead of raising a ValueError. 
+    """
+    if fn is None or isinstance(fn, str):
+        return fn
+    elif isinstance(fn, FilterRef):
+        return fn.ref
+    elif not callable(fn):
+        raise TypeError("Filter functions must be callable, not {}!".format(type(fn)))
+
+    module = getattr(fn, '__module__', None)
+    qualname = getattr(fn, '__qualname__', None)
+    if module is None or qualname is None or not _isImportable(fn, module, qualname):
+        if strict:
+            raise ValueError("Cannot reference {!r} by import path!".format(fn))
+        return fn
+    return "{}:{}".format(module, qualname)
+
+
+def _isImportable(fn, module, qualname):
+    """ Return True if importing "module:qualname" yields `fn` itself. """
+    if '<' in qualname:
+        return False
+    #Methods bound to an instance would lose the instance
+    owner = getattr(fn, '__self__', None)
+    if owner is not None and not isinstance(owner, (types.ModuleType, type)):
+        return False
+    obj = sys.modules.get(module)
+    if obj is None:
+        return False
+    for name in qualname.split('.'):
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return False
+    return obj is fn
+
+
+def makeRef(fn):
+    """
+    Return `fn` as `FilterRef` where possible. Strings are either 
+    import paths or names of registered filters. Callables that can't 
+    be imported by path and None are returned unchanged. 
+    """
+    if fn is None or isinstance(fn, FilterRef):
+        return fn
+    elif isinstance(fn, str):
+        if ':' in fn:
+            return FilterRef(fn)
+        return registry.getFunction(fn)
+    ref = toRef(fn, strict=False)
+    if isinstance(ref, str):
+        return FilterRef.fromFunction(fn)
+    return fn
+
+
+def resolveFunction(fn):
+    """ Return the function referenced by `fn`, importing it if necessary. """
+    fn = makeRef(fn)
+    if isinstance(fn, FilterRef):
+        return fn.resolve()
+    return fn
+
+
+def getCapabilities(fn, resolve=True):
+    """
+    Return the `FilterCapabilities` of the filter function `fn`. 
+    Capabilities registered with the `registry` are found without
+    importing the function, those declared on the function itself
+    (see `declareCapabilities()`) only if it is already imported or
+    `resolve` is True. Functions without declaration get the default,
+    conservative capabilities.
+    """
+    if fn is None:
+        return FilterCapabilities()
+    ref = makeRef(fn)
+    if isinstance(ref, FilterRef):
+        capabilities = registry.findCapabilities(ref)
+        if capabilities is not None:
+            return capabilities
+        if not ref.isResolved() and not resolve:
+            return FilterCapabilities()
+        fn = ref.resolve()
+    capabilities = getattr(fn, 'filter_capabilities', None)
+    if isinstance(capabilities, FilterCapabilities):
+        return capabilities
+    return FilterCapabilities()
@@ -1,5 +1,19 @@
 
-from parameters.widget import ParameterView
 from parameters.model import ParameterModel
 
-__all__ = [ParameterView, ParameterModel]
+__all__ = ['ParameterView', 'ParameterModel']
+
+#Widgets are only imported once requested, so that the models can be 
+#used without loading QtWidgets
+_WIDGETS = {
+    'ParameterView': 'parameters.widget',
+}
+
+
+def __getattr__(name):
+    if name in _WIDGETS.keys():
+        import importlib
+        value = getattr(importlib.import_module(_WIDGETS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -24,6 +24,10 @@ class ValueDelegate(QtWidgets.QStyledItemDelegate):
     The ValueDelegate is used in the second column of a ParameterView. 
     It ensures that an approriate editor is shown when clicking the item
     and that the editor's value is stored in the model again.  
+
+    Boolean values are painted as check boxes and toggled directly on
+    click or space, so they don't need an editor widget at all. A 
+    middle click or shift+space resets them to their default. 
     """
     def __init__(self):
         super().__init__()
@@ -37,10 +41,44 @@ class ValueDelegate(QtWidgets.QStyledItemDelegate):
         if index.data(ValueItem.ROLE_TYPE) == 'group':
             option.features &= ~QtWidgets.QStyleOptionViewItem.HasDisplay
         elif index.data(ValueItem.ROLE_TYPE) == 'bool':
+            option.features &= ~QtWidgets.QStyleOptionViewItem.HasDisplay
+            option.features |= QtWidgets.QStyleOptionViewItem.HasCheckIndicator
             if index.data(ValueItem.ROLE_VALUE):
-                option.text = "✓"
+                option.checkState = QtCore.Qt.Checked
             else:
-                option.text = "☓"
+                option.checkState = QtCore.Qt.Unchecked
+
+    def editorEvent(self, event, model, option, index):
+        if index.data(ValueItem.ROLE_TYPE) != 'bool':
+            return super().editorEvent(event, model, option, index)
+
+        flags = index.flags()
+        if not flags & QtCore.Qt.ItemIsEnabled or not flags & QtCore.Qt.ItemIsEditable:
+            return False
+
+        #Presses go to the view, so that clicking still selects the row
+        if event.type() == QtCore.QEvent.MouseButtonRelease:
+            if event.button() == QtCore.Qt.MiddleButton:
+                return self._resetBool(model, index)
+            if event.button() != QtCore.Qt.LeftButton:
+                return False
+        elif event.type() == QtCore.QEvent.MouseButtonDblClick:
+            #Swallow the second click, it doesn't toggle again
+            return event.button() == QtCore.Qt.LeftButton
+        elif event.type() == QtCore.QEvent.KeyPress:
+            if event.key() not in [QtCore.Qt.Key_Space, QtCore.Qt.Key_Select]:
+                return False
+            if event.modifiers() & QtCore.Qt.ShiftModifier:
+                return self._resetBool(model, index)
+        else:
+            return False
+
+        value = not index.data(ValueItem.ROLE_VALUE)
+        return model.setData(index, value, ValueItem.ROLE_VALUE)
+
+    def _resetBool(self, model, index):
+        default = bool(index.data(ValueItem.ROLE_DEFAULT))
+        return model.setData(index, default, ValueItem.ROLE_VALUE)
 
     def setEditorData(self, editor, index):
         t = index.data(ValueItem.ROLE_TYPE)
@@ -56,8 +94,6 @@ class ValueDelegate(QtWidgets.QStyledItemDelegate):
             editor.setCurrentText(str(v))
         elif t == 'named_list':
             editor.setCurrentText(v)
-        elif t == 'bool':
-            editor.setChecked(v)
         else:
             super().setEditorData(editor, index)
 
@@ -74,8 +110,6 @@ class ValueDelegate(QtWidgets.QStyledItemDelegate):
             v = editor.currentText()
         elif t == 'named_list':
             v = editor.currentText()
-        elif t == 'bool':
-            v = editor.isChecked()
         else:
             return super().setModelData(editor, model, index)
         model.setData(index, v, ValueItem.ROLE_VALUE)
@@ -122,9 +156,8 @@ class ValueDelegate(QtWidgets.QStyledItemDelegate):
             w.setCurrentText(v)
 
         elif t == 'bool':
-            w = ResettableCheckBox(dv, self, parent=parent)
-            w.setTristate(False)
-            w.setChecked(v)
+            #Toggled in editorEvent() instead
+            return None
 
         elif t == 'group':
             w = QtWidgets.QWidget(parent=parent)
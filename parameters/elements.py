@@ -2,7 +2,7 @@
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 __all__ = ['ResettableSpinbox', 'ResettableDoubleSpinbox',
-    'ResettableLineEdit', 'ResettableComboBox', 'ResettableCheckBox']
+    'ResettableLineEdit', 'ResettableComboBox']
 
 
 class _ResettableElement(QtWidgets.QWidget):
@@ -28,8 +28,6 @@ class _ResettableElement(QtWidgets.QWidget):
             e.textChanged.connect(lambda: b.setEnabled(True))
         elif self.editor_cls in [QtWidgets.QComboBox]:
             e.currentTextChanged.connect(lambda: b.setEnabled(True))
-        elif self.editor_cls in [QtWidgets.QCheckBox]:
-            e.stateChanged.connect(lambda: b.setEnabled(True))
         
         l.addWidget(b)
 
@@ -40,8 +38,6 @@ class _ResettableElement(QtWidgets.QWidget):
             self.editor.setText(self.default)
         elif self.editor_cls in [QtWidgets.QComboBox]:
             self.editor.setCurrentText(str(self.default))
-        elif self.editor_cls in [QtWidgets.QCheckBox]:
-            self.editor.setChecked(self.default)
         else:
             return
         self.editor.repaint()
@@ -99,16 +95,3 @@ class ResettableComboBox(_ResettableElement):
     def setItemData(self, index, data, role): self.editor.setItemData(index, data, role)
     def count(self): return self.editor.count()
     def itemText(self, index): return self.editor.itemText(index)
-
-
-class ResettableCheckBox(_ResettableElement):
-    def __init__(self, default, delegate, *args, **kwargs):
-        editor_cls = QtWidgets.QCheckBox
-        super().__init__(editor_cls, default, *args, **kwargs)
-        self.delegate = delegate
-        self.editor.stateChanged.connect(lambda: self.delegate.commitData.emit(self))
-        
-    def setChecked(self, value): self.editor.setChecked(value)
-    def isChecked(self): return self.editor.isChecked()
-    def setTristate(self, value): self.editor.setTristate(value)
-    def isTristate(self): return self.editor.isTristate()
@@ -1,5 +1,5 @@
 
-from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5 import QtCore, QtGui
 
 
 class NameItem(QtGui.QStandardItem):
@@ -217,7 +217,10 @@ class Parameter(QtCore.QObject):
             - default (optional for type='group')
             - properties (optional): a dict containing information 
               like 'options', 'option_descriptions', 'maximum', 'minimum',
-              'single_step', ...
+              'single_step', ... For int and float parameters, 
+              'scale_with_resolution' declares that the value is a size 
+              in pixels which must be scaled when processing a 
+              downsampled preview.
             - children (optional): a list of all child parameters
         """
         super().__init__()
@@ -391,6 +394,7 @@ class Parameter(QtCore.QObject):
                 p['maximum'] = 99
             if not 'single_step' in keys:
                 p['single_step'] = 1
+            p['scale_with_resolution'] = self._fixupScaleWithResolution(p)
 
         elif t == 'float':
             if not 'minimum' in keys:
@@ -399,6 +403,7 @@ class Parameter(QtCore.QObject):
                 p['maximum'] = 1.0
             if not 'single_step' in keys:
                 p['single_step'] = 0.1
+            p['scale_with_resolution'] = self._fixupScaleWithResolution(p)
            
         elif t == 'string':
             p = {}
@@ -454,6 +459,17 @@ class Parameter(QtCore.QObject):
 
         return p 
 
+    def _fixupScaleWithResolution(self, p):
+        if not 'scale_with_resolution' in p.keys():
+            return False
+        value = p['scale_with_resolution']
+        if not isinstance(value, bool):
+            raise TypeError("scale_with_resolution must be passed as bool, not {}!".format(type(value)))
+        return value
+
+    def __reduce__(self):
+        return (Parameter, (self.name, self.serialize()))
+
     def __repr__(self):
         return str(self.serialize())
 
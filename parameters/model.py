@@ -1,6 +1,9 @@
 
-from PyQt5 import QtCore, QtGui, QtWidgets
+import contextlib
 
+from PyQt5 import QtCore, QtGui
+
+import tracing
 from parameters.item import Parameter, NameItem, ValueItem
 
 
@@ -23,6 +26,10 @@ class ParameterModel(QtGui.QStandardItemModel):
         Emitted when a parameter's active status changes. 
     signal_model_change:
         Emitted when either of the above signals is emitted. 
+
+    Wrap bulk changes in `batchUpdate()` (or `beginUpdate()` and 
+    `endUpdate()`) to suppress the per-parameter signals and emit a
+    single `signal_model_change` at the end instead.
     """
     signal_parameter_changed = QtCore.pyqtSignal(Parameter)
     signal_parameter_toggled = QtCore.pyqtSignal(Parameter)
@@ -41,6 +48,8 @@ class ParameterModel(QtGui.QStandardItemModel):
             are children of this parameter
         """
         super().__init__(*args, **kwargs)
+        self._update_depth = 0
+        self._update_changed = False
         self.root_param = rp = root_param
         self.setColumnCount(2)
         self.setHeaderData(0, QtCore.Qt.Horizontal, "Parameter")
@@ -82,12 +91,12 @@ class ParameterModel(QtGui.QStandardItemModel):
         ValueError
             Raised if there are doubled keys in the param dict. 
         """
-        opts = {'type': 'group', 'children': params}
-        root_param = Parameter('root', opts)
-        cls._verifyRoot(root_param)
-        obj = cls(root_param)
-
-        print("created param_model",obj)
+        with tracing.span('parameters.create') as span:
+            opts = {'type': 'group', 'children': params}
+            root_param = Parameter('root', opts)
+            cls._verifyRoot(root_param)
+            obj = cls(root_param)
+            span.subject = obj
         return obj
     
     def getValues(self, only_active=True):
@@ -110,33 +119,75 @@ class ParameterModel(QtGui.QStandardItemModel):
         else:
             return {param.name: param.value for param in self.params if not param.type == 'group'}
 
+    def getScaledNames(self):
+        """
+        Return the names of all parameters whose values must be scaled
+        with the image resolution (see the 'scale_with_resolution' 
+        property of int and float parameters).
+        """
+        return [param.name for param in self.params if param.type in ['int', 'float'] and param.properties.get('scale_with_resolution', False)]
+
     def serialize(self):
         """ Return a serialised representation of the entire model. """
-        retval = self.root_param.serialize()['children']
+        with tracing.span('parameters.serialize'):
+            retval = self.root_param.serialize()['children']
         return retval
 
     def setReadonly(self, readonly=True):
+        if readonly == self._readonly:
+            return
         self._readonly = readonly
-        for param in self.params: 
-            param.setReadonly(readonly=readonly)
+
+        #Flag changes aren't parameter changes: block the per-item signals
+        #and let attached views relayout once instead. Emitting dataChanged
+        #would make the model emit itemChanged for every item again.
+        self.layoutAboutToBeChanged.emit()
+        blocked = self.blockSignals(True)
+        try:
+            for param in self.params: 
+                param.setReadonly(readonly=readonly)
+        finally:
+            self.blockSignals(blocked)
+        self.layoutChanged.emit()
 
     def isReadonly(self):
         return self._readonly
 
-    def openPersistentEditors(self, view):
-        """ Open persistent editors for all boolean parameters. """
-        for param in self.params:
-            if param.type == 'bool':
-                view.openPersistentEditor(param.value_item.index())
+    def beginUpdate(self):
+        """ 
+        Start a bulk update. Until the matching `endUpdate()`, no 
+        parameter signals are emitted. Calls can be nested. 
+        """
+        self._update_depth += 1
 
-    def closePersistentEditors(self, view):
-        """ Close persistent editors for all boolean parameters. """
-        for param in self.params:
-            if param.type == 'bool':
-                view.closePersistentEditor(param.value_item.index())
+    def endUpdate(self):
+        """ 
+        End a bulk update, emitting `signal_model_change` once if any
+        parameter changed during the update. 
+        """
+        if self._update_depth == 0:
+            raise RuntimeError("endUpdate() called without beginUpdate()!")
+        self._update_depth -= 1
+        if self._update_depth == 0 and self._update_changed:
+            self._update_changed = False
+            self.signal_model_change.emit()
+
+    def isUpdating(self):
+        return self._update_depth > 0
+
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """ Context manager wrapping `beginUpdate()` and `endUpdate()`. """
+        self.beginUpdate()
+        try:
+            yield self
+        finally:
+            self.endUpdate()
 
     def _onItemChange(self, item):
-        if isinstance(item, NameItem): 
+        if self.isUpdating():
+            self._update_changed = True
+        elif isinstance(item, NameItem): 
             self.signal_parameter_toggled.emit(item.param)
         elif isinstance(item, ValueItem):
             self.signal_parameter_changed.emit(item.param)
@@ -183,6 +234,9 @@ class ParameterModel(QtGui.QStandardItemModel):
                 name_list.append(name)
 
 
+    def __reduce__(self):
+        return (ParameterModel.createModel, (self.serialize(),))
+
     def __repr__(self):
         return str(self.serialize())
 
@@ -1,4 +1,7 @@
 
+import collections
+import weakref
+
 from PyQt5 import QtCore, QtWidgets, QtGui
 
 from parameters.delegates import NameDelegate, ValueDelegate
@@ -10,7 +13,19 @@ class ParameterView(QtWidgets.QTreeView):
     When set to readonly-mode, the parameters can only be viewed and not
     altered. When readonly-mode is off, an appropriate editor will 
     be displayed in the left column for each value when clicking on it. 
+
+    No editor widgets are kept open: the delegates paint all values and
+    editors are only created on interaction. The name column's width is
+    measured once per model and cached. 
+
+    A single view can be reused for many models with `showModel()`,
+    which remembers the expand state and scroll position of the 
+    `STATE_CACHE_SIZE` most recently shown models. 
     """
+    STATE_CACHE_SIZE = 16
+    #Name column widths per model, shared by all views
+    _column_widths = weakref.WeakKeyDictionary()
+
     def __init__(self, model=None, readonly=False, *args, **kwargs):
         """
         Initialize the ParameterView instance. 
@@ -23,40 +38,123 @@ class ParameterView(QtWidgets.QTreeView):
             If True, the parameters cannot be edited. 
         """
         super().__init__(*args, **kwargs)
+        self._resizing = False
+        self.header().sectionResized.connect(self._onSectionResized)
         if model: 
             self.setModel(model)
         self._readonly = readonly
+        self._view_states = collections.OrderedDict()
 
         #Delegate stuff 
         self.name_delegate = nd = NameDelegate()
         self.value_delegate = vd = ValueDelegate()
         self.setItemDelegateForColumn(0, nd)
         self.setItemDelegateForColumn(1, vd)
-        self.model().openPersistentEditors(self)
         self.setReadonly(readonly=readonly)
 
         #Visual stuff 
         self.setVerticalScrollMode(self.ScrollPerPixel)
         self.setHorizontalScrollMode(self.ScrollPerPixel)
-        self.header().setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        self.setUniformRowHeights(True)
+        self.header().setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
+        self.header().setStretchLastSection(True)
         self.setEditTriggers(self.CurrentChanged|self.DoubleClicked|self.SelectedClicked|self.EditKeyPressed)
         self.setSelectionMode(self.SingleSelection)
         self.expandAll()
         self.setAlternatingRowColors(True)
+        self._resizeColumns()
     
     def clear(self):
         """ Empty the view by removing the model """
-        self.setModel(None)
+        self.showModel(None)
+
+    def setModel(self, model):
+        #The view creates a new selection model for every model
+        selection_model = self.selectionModel()
+        super().setModel(model)
+        if selection_model is not None:
+            selection_model.deleteLater()
+
+    def showModel(self, model):
+        """
+        Show `model` in this view, keeping the delegates and editors
+        of the view. The expand state and scroll position of the 
+        previous model are stored and restored once it is shown again. 
+
+        Parameters
+        ----------
+        model : filter_tree.parameters.model.ParameterModel
+            The parameter model to show, or None to empty the view. 
+        """
+        current = self.model()
+        if model is current:
+            return
+        if current is not None:
+            #Commit and close any open editor before switching
+            self.setCurrentIndex(QtCore.QModelIndex())
+            self._storeViewState(current)
+
+        self.setModel(model)
+        if model is None:
+            return
+        model.setReadonly(readonly=self._readonly)
+        self._restoreViewState(model)
+
+    def _storeViewState(self, model):
+        collapsed = [param for param in model.params if param.name_item.hasChildren() 
+            and not self.isExpanded(param.name_item.index())]
+        scroll = (self.horizontalScrollBar().value(), self.verticalScrollBar().value())
+        self._view_states[model] = (collapsed, scroll)
+        self._view_states.move_to_end(model)
+        while len(self._view_states) > self.STATE_CACHE_SIZE:
+            self._view_states.popitem(last=False)
+
+    def _restoreViewState(self, model):
+        self.expandAll()
+        self._resizeColumns()
+        state = self._view_states.get(model)
+        if state is None:
+            self.scrollToTop()
+            return
+        collapsed, (h_scroll, v_scroll) = state
+        for param in collapsed:
+            self.collapse(param.name_item.index())
+        self.executeDelayedItemsLayout()
+        self.horizontalScrollBar().setValue(h_scroll)
+        self.verticalScrollBar().setValue(v_scroll)
 
     def setReadonly(self, readonly=True): 
         self._readonly = readonly
-        self.model().setReadonly(readonly=readonly)
-        if readonly:
-            self.model().closePersistentEditors(self)
-        else:
-            self.model().openPersistentEditors(self)
+        if self.model() is not None:
+            self.model().setReadonly(readonly=readonly)
         
     def isReadOnly(self):
         return self._readonly
 
-        
\ No newline at end of file
+    def _resizeColumns(self):
+        """ Resize the name column to the cached width for the model. """
+        model = self.model()
+        if model is None:
+            return
+        width = self._column_widths.get(model)
+        if width is None:
+            width = self._column_widths[model] = self.sizeHintForColumn(0)
+        self._resizing = True
+        try:
+            self.header().resizeSection(0, width)
+        finally:
+            self._resizing = False
+
+    def _onSectionResized(self, column, old_size, new_size):
+        #Resized by the user: measure again the next time the model is shown
+        if column == 0 and not self._resizing and self.model() is not None:
+            self._column_widths.pop(self.model(), None)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QtCore.QEvent.FontChange:
+            #All cached widths were measured with the previous font
+            self._column_widths.clear()
+            self._resizeColumns()
+
+        
@@ -0,0 +1,13 @@
+
+from processing.plan import PlanNode, ExecutionPlan, PlanCompiler
+from processing.buffers import BufferPool, FilterContext
+from processing.cache import ResultCache
+from processing.fingerprint import Fingerprinter, fingerprinter
+from processing.executor import Executor, ProcessExecutor, ThreadedExecutor, CancellationToken, RunCancelled
+from processing.preview import PyramidCache
+from processing.transport import SharedArray, SharedMemoryPool
+
+__all__ = [PlanNode, ExecutionPlan, PlanCompiler, Executor, ProcessExecutor, 
+    ThreadedExecutor, CancellationToken, RunCancelled, PyramidCache, SharedArray, 
+    SharedMemoryPool, BufferPool, FilterContext, ResultCache, 
+    Fingerprinter, fingerprinter]
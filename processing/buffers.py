@@ -0,0 +1,162 @@
+import collections
+import threading
+import weakref
+
+import numpy as np
+
+
+class BufferPool:
+    """
+    The `BufferPool` recycles the memory of output arrays. Arrays are
+    requested with `empty()`; once such an array (and every view of it)
+    was garbage collected, its memory is kept and handed out again for
+    the next request with the same shape and dtype. Reused memory is 
+    already paged in, which saves the page faults of fresh allocations
+    on large images. 
+
+    At most `max_bytes` of unused memory are retained; the least 
+    recently freed buffers are dropped first. The pool may be used 
+    from several threads. 
+    """
+    def __init__(self, max_bytes=1 << 30):
+        """
+        Initialize the `BufferPool`.
+
+        Parameters
+        ----------
+        max_bytes : int
+            The maximum number of bytes of unused buffers to keep.
+        """
+        self.max_bytes = max_bytes
+        self._free = collections.OrderedDict()
+        self._retained = 0
+        self._outstanding = 0
+        self._requests = 0
+        self._hits = 0
+        self._lock = threading.Lock()
+
+    def empty(self, shape, dtype=np.float64):
+        """ Return an uninitialized array, reusing a freed buffer if possible. """
+        if isinstance(shape, int):
+            shape = (shape,)
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        if dtype.hasobject:
+            return np.empty(shape, dtype=dtype)
+        key = (shape, dtype.str)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+
+        with self._lock:
+            self._requests += 1
+            self._outstanding += nbytes
+            buffers = self._free.get(key)
+            if buffers:
+                raw = buffers.pop()
+                if len(buffers) == 0:
+                    del self._free[key]
+                self._retained -= nbytes
+                self._hits += 1
+            else:
+                raw = None
+        if raw is None:
+            raw = np.empty(max(nbytes, 1), dtype=np.uint8)
+
+        #The memoryview ends numpy's base chain at `flat`, so every view
+        #keeps `flat` alive and the buffer is only recycled once no view
+        #is left
+        flat = np.frombuffer(memoryview(raw), dtype=dtype, count=int(np.prod(shape)))
+        weakref.finalize(flat, self._recycle, key, raw, nbytes)
+        return flat.reshape(shape)
+
+    def empty_like(self, array, dtype=None):
+        """ Return an uninitialized array with the shape and dtype of `array`. """
+        return self.empty(array.shape, array.dtype if dtype is None else dtype)
+
+    def stats(self):
+        """ 
+        Return a dict with the number of 'requests', the 'hit_rate',
+        the 'retained' bytes of unused buffers and the 'outstanding'
+        bytes of arrays in use. 
+        """
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'hit_rate': self._hits / self._requests if self._requests > 0 else 0.0,
+                'retained': self._retained,
+                'outstanding': self._outstanding,
+            }
+
+    def clear(self):
+        """ Drop all unused buffers. """
+        with self._lock:
+            self._free.clear()
+            self._retained = 0
+
+    def _recycle(self, key, raw, nbytes):
+        with self._lock:
+            self._outstanding -= nbytes
+            if nbytes > self.max_bytes:
+                return
+            self._free.setdefault(key, []).append(raw)
+            self._free.move_to_end(key)
+            self._retained += nbytes
+            while self._retained > self.max_bytes:
+                old_key, buffers = next(iter(self._free.items()))
+                buffers.pop(0)
+                if len(buffers) == 0:
+                    del self._free[old_key]
+                self._retained -= int(np.prod(old_key[0])) * np.dtype(old_key[1]).itemsize
+
+
+class FilterContext:
+    """
+    The `FilterContext` is passed to filter functions accepting a 
+    `context` keyword argument. Filters should allocate their outputs
+    with `empty()` or `empty_like()`, e.g. to pass them as `out=` to 
+    numpy functions, so that the executor can recycle the memory.
+
+    If the filter declared to work in place and its input isn't used
+    anywhere else, the executor donates the input: the first matching
+    call of `empty_like()` then returns the input array itself.
+    """
+    def __init__(self, buffers=None, token=None, factor=1, donated=None):
+        """
+        Initialize the `FilterContext`.
+
+        Parameters
+        ----------
+        buffers : BufferPool
+            The pool to allocate from. If None, arrays are allocated 
+            with numpy directly. 
+        token : filter_tree.processing.executor.CancellationToken
+            The run's token, or None
+        factor : int
+            The downsampling factor of the run's input
+        donated : numpy.ndarray
+            The input whose memory may be reused for the output, or None
+        """
+        self.buffers = buffers
+        self.token = token
+        self.factor = factor
+        self.donated = donated
+
+    def empty(self, shape, dtype=np.float64):
+        if self.buffers is None:
+            return np.empty(shape, dtype=dtype)
+        return self.buffers.empty(shape, dtype)
+
+    def empty_like(self, array, dtype=None):
+        dtype = array.dtype if dtype is None else np.dtype(dtype)
+        if self._canReuse(array, dtype):
+            self.donated = None
+            return array
+        return self.empty(array.shape, dtype)
+
+    def _canReuse(self, array, dtype):
+        donated = self.donated
+        return (donated is not None and array is donated and isinstance(array, np.ndarray)
+                and array.dtype == dtype and array.flags.writeable and array.flags.c_contiguous)
+
+    def raiseIfCancelled(self):
+        if self.token is not None:
+            self.token.raiseIfCancelled()
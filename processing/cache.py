@@ -0,0 +1,195 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from save_info.writer import fileMode
+
+
+class ResultCache:
+    """
+    The `ResultCache` keeps the results of plan nodes in a directory,
+    so that they survive restarts of the application and can be shared
+    by several processes on the same host.
+
+    Results are stored as `.npy` files named by the node's cache key
+    (see `PlanNode.cacheKey()`), a content hash of the node's function,
+    parameter values and the keys of its sources, rooted in the
+    fingerprint of the input. Identical computations therefore map to
+    the same file, no matter which tree or process they come from.
+
+    Files are written to a temporary file first and then renamed, so
+    readers never see partial results. Once the cache grows beyond
+    `max_bytes`, the least recently used files are removed until it is
+    below `LOW_WATER` of that size. Files removed while another process
+    reads them stay readable on POSIX systems; lookups of removed files
+    are just misses.
+    """
+    EXTENSION = '.npy'
+    LOW_WATER = 0.8
+    STALE_TEMPORARY = 3600
+
+    def __init__(self, directory, max_bytes=8 << 30):
+        """
+        Initialize the `ResultCache`.
+
+        Parameters
+        ----------
+        directory : str
+            The cache directory, created if it doesn't exist.
+        max_bytes : int
+            The maximum total size of all cached results.
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = None
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        """ Return the path of the file holding the result of `key`. """
+        return os.path.join(self.directory, key[:2], key + self.EXTENSION)
+
+    def get(self, key):
+        """ Return the cached result of `key`, or None if it isn't cached. """
+        path = self.path(key)
+        try:
+            array = np.load(path, allow_pickle=False)
+        except OSError:
+            #Missing, e.g. evicted meanwhile, or not readable by us
+            array = None
+        except (ValueError, EOFError, pickle.UnpicklingError):
+            #Truncated or otherwise undecodable, e.g. after a full disk
+            self._remove(path)
+            array = None
+        else:
+            self._touch(path)
+
+        with self._lock:
+            if array is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return array
+
+    def contains(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, key, array):
+        """
+        Store `array` as the result of `key`. Results that can't be
+        stored without pickling or exceed `max_bytes` are ignored.
+        """
+        if not isinstance(array, np.ndarray) or array.dtype.hasobject or array.nbytes > self.max_bytes:
+            return
+        path = self.path(key)
+        if os.path.exists(path):
+            self._touch(path)
+            return
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                np.save(fp, array, allow_pickle=False)
+            os.chmod(tmp_path, fileMode(path))
+            #Measured before the rename, the file may be evicted right after
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            full = self._size is None or self._size > self.max_bytes
+        if full:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used results until the cache is below
+        `LOW_WATER` of `max_bytes`, if it exceeds `max_bytes`. Also
+        removes temporary files left behind by crashed writers.
+        """
+        entries, total = [], 0
+        now = time.time()
+        for path, stat in self._scan():
+            if path.endswith('.tmp'):
+                if now - stat.st_mtime > self.STALE_TEMPORARY:
+                    self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total > self.max_bytes:
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= self.max_bytes * self.LOW_WATER:
+                    break
+                if self._remove(path):
+                    total -= size
+        with self._lock:
+            self._size = total
+
+    def size(self):
+        """ Return the total size of all cached results in bytes. """
+        total = sum(stat.st_size for path, stat in self._scan() if path.endswith(self.EXTENSION))
+        with self._lock:
+            self._size = total
+        return total
+
+    def clear(self):
+        """ Remove all cached results. """
+        for path, stat in self._scan():
+            self._remove(path)
+        with self._lock:
+            self._size = 0
+
+    def stats(self):
+        """ Return a dict with the number of 'hits' and 'misses' of this instance. """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses}
+
+    def _scan(self):
+        """ Yield the path and stat of every file in the cache directory. """
+        with os.scandir(self.directory) as directories:
+            for directory in directories:
+                if not directory.is_dir():
+                    continue
+                try:
+                    with os.scandir(directory.path) as files:
+                        for entry in files:
+                            try:
+                                yield entry.path, entry.stat()
+                            except FileNotFoundError:
+                                continue
+                except FileNotFoundError:
+                    continue
+
+    @staticmethod
+    def _touch(path):
+        """ 
+        Update the modification time of `path`, which orders the files
+        for eviction. Fails for files of other users or files evicted
+        meanwhile, which is harmless. 
+        """
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
@@ -0,0 +1,986 @@
+import concurrent.futures
+import logging
+import os
+import threading
+
+import numpy as np
+from PyQt5 import QtCore
+
+from filters.registry import FilterRef
+from processing.buffers import BufferPool
+from processing.preview import PyramidCache, downsample
+from processing.transport import SHARED_MEMORY_THRESHOLD, SharedArray, SharedMemoryPool, packOutput
+
+
+class RunCancelled(Exception):
+    """ Raised by `CancellationToken.raiseIfCancelled()` to abort a run. """
+    pass
+
+
+class CancellationToken:
+    """
+    The `CancellationToken` is used to cooperatively cancel a run. 
+    Filter functions accepting a `token` keyword argument are passed 
+    the run's token and should call `raiseIfCancelled()` regularly 
+    during long computations.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """ Request cancellation of the run. """
+        self._event.set()
+
+    def isCancelled(self):
+        return self._event.is_set()
+
+    def raiseIfCancelled(self):
+        """ Raise `RunCancelled` if cancellation was requested. """
+        if self._event.is_set():
+            raise RunCancelled()
+
+
+class Executor:
+    """
+    The `Executor` runs an `ExecutionPlan`, writes the results of nodes
+    with saves using its `SaveWriter` and assigns the results to the
+    plan's `FilterItems`.
+
+    Running a plan only accesses the snapshots taken by the plan's nodes,
+    never the items themselves, so `execute()` may be called from any
+    thread. Subclasses can reimplement `nodeStarted()`, `nodeFinished()`
+    and `nodeFailed()` to follow a run. A run stops as soon as its
+    `CancellationToken` is cancelled.
+
+    Plans can be run on a downsampled input for previews. Inputs are
+    then taken from the `PyramidCache` if one is given, and nothing
+    is saved.
+
+    Filter functions accepting a `context` keyword argument can allocate
+    their outputs from the executor's `BufferPool`, which recycles the
+    memory of outputs that are no longer referenced. Filters declared
+    `in_place` (see `filters.capabilities`) are given the memory of 
+    their input instead, if the input isn't a sink, isn't used by any
+    other node and doesn't share memory with any other result, e.g. as
+    a view of its own input. The items of such a donated input receive
+    no output.
+
+    Nodes are run within a `memory_budget`: a node whose predicted peak
+    memory (see `PlanNode.estimateMemory()`) exceeds the budget is 
+    computed in tiles if its function allows it. The budget covers the
+    memory needed while computing a node, not the results kept for
+    the items.
+
+    Before running, the plan's output specs are predicted (see 
+    `ExecutionPlan.inferSpecs()`) if `CHECK_SPECS` is True. If any node
+    is predicted to fail, e.g. because the branches of a modifier have
+    incompatible shapes, the run fails without computing anything.
+
+    If a `ResultCache` is given, full resolution results are stored in
+    it and nodes whose result is cached aren't computed. Nodes only
+    feeding cached nodes are skipped entirely, their items receive no
+    result. `restore()` assigns all cached results of a plan to its
+    items without running anything, e.g. after loading a tree.
+    """
+    MEMORY_FRACTION = 0.5
+    CHECK_SPECS = True
+
+    def __init__(self, writer=None, token=None, pyramid=None, buffers=None, memory_budget=None, cache=None):
+        """
+        Initialize the `Executor`.
+
+        Parameters
+        ----------
+        writer : filter_tree.save_info.writer.SaveWriter
+            The writer used to save outputs. If None, nothing is saved.
+        token : CancellationToken
+            The token used to cancel runs. If None, a new one is created.
+        pyramid : filter_tree.processing.preview.PyramidCache
+            The cache holding inputs and their downsampled versions. 
+            If None, inputs are loaded on every run.
+        buffers : filter_tree.processing.buffers.BufferPool
+            The pool output buffers are allocated from. If None, a new
+            one is created.
+        memory_budget : int
+            The memory in bytes available to running nodes. If None,
+            `MEMORY_FRACTION` of the physical memory, or no limit if
+            that can't be determined.
+        cache : filter_tree.processing.cache.ResultCache
+            The cache results are stored in and loaded from. If None,
+            nothing is cached.
+        """
+        self.writer = writer
+        self.token = token if token is not None else CancellationToken()
+        self.pyramid = pyramid
+        self.buffers = buffers if buffers is not None else BufferPool()
+        if memory_budget is None:
+            memory = physicalMemory()
+            memory_budget = int(memory * self.MEMORY_FRACTION) if memory is not None else None
+        self.memory_budget = memory_budget
+        self.cache = cache
+
+    def run(self, plan, apply=True):
+        """
+        Run all nodes of the plan in order.
+
+        Parameters
+        ----------
+        plan : filter_tree.processing.plan.ExecutionPlan
+            The plan to run
+        apply : bool
+            If True, assign results and errors to the plan's items.
+
+        Returns
+        -------
+        results : dict
+            Dict containing the result of each successful node as
+            node index:array pairs
+        errors : dict
+            Dict containing the error message of each failed node as
+            node index:message pairs
+        """
+        results, errors = self.execute(plan)
+        if apply:
+            self.applyResults(plan, results, errors)
+        return results, errors
+
+    def execute(self, plan, factor=1):
+        """
+        Run all nodes of the plan in order, without accessing any items.
+        Stops early if `isCancelled()` returns True.
+        If `factor` isn't 1, the plan is run on the input downsampled
+        by `factor` and nothing is saved. 
+        Returns the same as `run()`.
+        """
+        specs, errors = self.checkPlan(plan, factor)
+        if len(errors) > 0:
+            return {}, errors
+
+        results = {}
+        donated = self.findDonations(plan)
+        keys, cached, skipped = self.loadCached(plan, factor)
+        for node in plan:
+            if self.isCancelled():
+                break
+            if node.index in skipped:
+                continue
+
+            failed = [source.index for source in node.sources if source.index in errors.keys()]
+            if len(failed) > 0 and not node.index in cached.keys():
+                errors[node.index] = "Upstream item failed"
+                self.nodeFailed(node, errors[node.index])
+                continue
+
+            self.nodeStarted(node)
+            try:
+                if node.index in cached.keys():
+                    result = cached.pop(node.index)
+                elif node.op == node.OP_INPUT:
+                    result = self.loadInput(node, factor)
+                else:
+                    inputs = [results[source.index] for source in node.sources]
+                    result = self.evaluateNode(node, inputs, factor, self._isDonatedTo(node, donated))
+                #A run cancelled meanwhile is obsolete and must not save or report anything
+                self.token.raiseIfCancelled()
+                self.storeResult(node, keys, result, factor)
+            except RunCancelled:
+                break
+            except Exception as e:
+                logging.error("Error processing item {}: {}".format(node.name, repr(e)))
+                errors[node.index] = str(e)
+                self.nodeFailed(node, errors[node.index])
+                continue
+            finally:
+                self._dropDonated(node, donated, results)
+
+            results[node.index] = result
+            self._checkDonation(node, donated, results)
+            try:
+                if factor == 1:
+                    self.writeSaves(node, result)
+            except Exception as e:
+                logging.error("Error saving item {}: {}".format(node.name, repr(e)))
+                errors[node.index] = "Saving failed: {}".format(e)
+                self.nodeFailed(node, errors[node.index])
+                continue
+            self.nodeFinished(node, None if node.index in donated else result)
+        return results, errors
+
+    def loadCached(self, plan, factor=1):
+        """
+        Look up the results of `plan` in the cache. Returns the cache key
+        of each node, the cached results of all nodes needed for the
+        sinks as node index:array pairs, and the set of indices of the 
+        nodes that needn't run, as all their consumers are cached.
+        """
+        if self.cache is None or factor != 1:
+            return {}, {}, set()
+        keys = plan.cacheKeys()
+        consumers = plan.consumers()
+        needed, cached = set(), {}
+        for node in reversed(plan.nodes):
+            if not node.is_sink and not any(consumer.index in needed and not consumer.index in cached.keys()
+                                            for consumer in consumers[node.index]):
+                continue
+            needed.add(node.index)
+            if node.op != node.OP_INPUT and keys[node.index] is not None:
+                result = self.cache.get(keys[node.index])
+                if result is not None:
+                    cached[node.index] = result
+        skipped = set(node.index for node in plan if not node.index in needed)
+        return keys, cached, skipped
+
+    def storeResult(self, node, keys, result, factor=1):
+        """ Store the full resolution `result` of a filter or combine `node` in the cache. """
+        if self.cache is None or factor != 1 or node.op == node.OP_INPUT or keys.get(node.index) is None:
+            return
+        try:
+            self.cache.put(keys[node.index], result)
+        except Exception as e:
+            logging.warning("Caching the result of item {} failed: {}".format(node.name, repr(e)))
+
+    def restore(self, plan):
+        """
+        Assign the cached results of all nodes of `plan` to their items,
+        without computing anything. Returns the indices of the restored
+        nodes.
+        """
+        if self.cache is None:
+            return []
+        keys = plan.cacheKeys()
+        restored = []
+        for node in plan:
+            if node.op == node.OP_INPUT or keys[node.index] is None:
+                continue
+            result = self.cache.get(keys[node.index])
+            if result is not None:
+                self.applyResult(node, result)
+                restored.append(node.index)
+        return restored
+
+    def checkPlan(self, plan, factor=1):
+        """
+        Predict the specs of all nodes of `plan`. Return the specs and the
+        error messages of all nodes predicted to fail, which are reported
+        as failed.
+        """
+        if not self.CHECK_SPECS:
+            return {}, {}
+        specs, errors = plan.inferSpecs(factor=factor)
+        for node in plan:
+            if node.index in errors.keys():
+                logging.error("Item {} would fail: {}".format(node.name, errors[node.index]))
+                self.nodeFailed(node, errors[node.index])
+        return specs, errors
+
+    def findDonations(self, plan):
+        """
+        Return the set of indices of the nodes whose result is handed to
+        their only consumer, a filter working in place.
+        """
+        consumers = plan.consumers()
+        donated = set()
+        for node in plan:
+            if node.op != node.OP_FILTER or len(node.sources) != 1:
+                continue
+            source = node.sources[0]
+            if source.op == source.OP_INPUT or source.is_sink or len(consumers[source.index]) != 1:
+                continue
+            if node.capabilities().in_place:
+                donated.add(source.index)
+        return donated
+
+    @staticmethod
+    def _checkDonation(node, donated, results):
+        """
+        Withdraw the donation of the result of `node` if it shares memory
+        with another result, e.g. if its filter returned a view of its
+        input. The consumer would overwrite that result as well.
+        """
+        if not node.index in donated:
+            return
+        result = results[node.index]
+        if not isinstance(result, np.ndarray):
+            return
+        for index, other in results.items():
+            if index != node.index and isinstance(other, np.ndarray) and np.may_share_memory(result, other):
+                donated.discard(node.index)
+                return
+
+    @staticmethod
+    def _isDonatedTo(node, donated):
+        return len(node.sources) == 1 and node.sources[0].index in donated
+
+    @staticmethod
+    def _dropDonated(node, donated, results):
+        """ Forget the donated input of `node`, which may have been overwritten. """
+        if Executor._isDonatedTo(node, donated) and node.sources[0].index in results.keys():
+            results[node.sources[0].index] = None
+
+    def evaluateNode(self, node, inputs, factor=1, in_place=False):
+        """ 
+        Compute the result of the filter or combine `node` from `inputs`,
+        in tiles if it would exceed the memory budget otherwise. 
+        """
+        tile_rows = self.tileRows(node, inputs, factor)
+        if tile_rows is not None:
+            return node.evaluateTiled(inputs, tile_rows, token=self.token, factor=factor, buffers=self.buffers)
+        return node.evaluate(inputs, token=self.token, factor=factor, buffers=self.buffers, in_place=in_place)
+
+    def tileRows(self, node, inputs, factor=1):
+        """ 
+        Return the rows per tile `node` must be computed in to stay 
+        within the memory budget, or None to compute it at once. 
+        """
+        if self.memory_budget is None or node.estimateMemory(inputs) <= self.memory_budget:
+            return None
+        return node.tileRows(inputs, self.memory_budget, factor)
+
+    def loadInput(self, node, factor=1):
+        """ Return the result of the input `node`, downsampled by `factor`. """
+        load = lambda: node.evaluate([], token=self.token, buffers=self.buffers)
+        key = node.inputKey()
+        if self.pyramid is None or key is None:
+            return downsample(load(), factor)
+        return self.pyramid.get(key, load, factor)
+
+    def writeSaves(self, node, result):
+        """ Write `result` to all saves of the node's items. """
+        if self.writer is None:
+            return
+        for name, saves, provenance in node.saves:
+            self.writer.write(result, saves, name, provenance=provenance)
+
+    def applyResults(self, plan, results, errors):
+        """ Assign results and errors to the plan's items. """
+        for node in plan:
+            if node.index in errors.keys():
+                self.applyResult(node, None, errors[node.index])
+            elif node.index in results.keys():
+                self.applyResult(node, results[node.index])
+
+    def applyResult(self, node, output, error=None, factor=1):
+        """ 
+        Assign a single result or error to all items of `node`. Results
+        of previews (`factor` other than 1) aren't marked as processed.
+        """
+        for item in node.items:
+            item.output = output
+            item.is_processed = error is None and factor == 1
+            item.has_processing_error = error is not None
+            if error is not None:
+                item.status_message = error
+            elif factor == 1:
+                item.status_message = "Processed"
+            else:
+                item.status_message = "Preview (1/{})".format(factor)
+
+    def isCancelled(self):
+        return self.token.isCancelled()
+
+    def nodeStarted(self, node): pass
+    def nodeFinished(self, node, result): pass
+    def nodeFailed(self, node, message): pass
+
+
+class ProcessExecutor(Executor):
+    """
+    The `ProcessExecutor` runs the filter and combine nodes of a plan in
+    parallel. Nodes are started as soon as all their sources are done, 
+    so independent nodes, e.g. the branches of a modifier, run in 
+    parallel. Workers aren't passed the `CancellationToken`; a cancelled
+    run stops once the running nodes finished.
+
+    Each node is placed according to the `FilterCapabilities` of its
+    function: thread-safe functions releasing the GIL run in a pool of
+    threads, all others in a pool of worker processes. Input nodes, 
+    saving and nodes whose function can't be imported by path (e.g. 
+    lambdas) run in the calling thread. At most `max_concurrency` calls
+    of the same function run at once.
+
+    Arrays of at least `SHARED_MEMORY_THRESHOLD` bytes are exchanged
+    through a `SharedMemoryPool`. Only their descriptors are sent to the
+    workers, which map the upstream arrays read-only without copying.
+    A node's block is released as soon as all its consumers finished,
+    and reclaimed once its result isn't referenced anymore (i.e. when
+    the items' outputs are replaced). Inputs are only donated to 
+    in-place filters running in this process.
+
+    Nodes are only started while the predicted peak memory of all 
+    running nodes stays within the `memory_budget`. A node exceeding the
+    budget on its own runs alone, computed in tiles in this process if
+    its function allows it. Cached results are loaded and stored in 
+    this process.
+    """
+    PLACE_LOCAL = 'local'
+    PLACE_THREAD = 'thread'
+    PLACE_PROCESS = 'process'
+
+    def __init__(self, writer=None, token=None, pyramid=None, max_workers=None, mp_context=None, pool=None, buffers=None,
+                 memory_budget=None, cache=None):
+        """
+        Initialize the `ProcessExecutor`.
+
+        Parameters
+        ----------
+        writer, token, pyramid, buffers, memory_budget, cache : 
+            See `Executor`. The pool is only used for nodes run in this
+            process, each worker has a pool of its own.
+        max_workers : int
+            The number of worker processes and threads. If None, the 
+            number of CPUs.
+        mp_context : multiprocessing.context.BaseContext
+            The context used to start the workers
+        pool : filter_tree.processing.transport.SharedMemoryPool
+            The pool holding shared arrays. If None, a new one is created.
+        """
+        super().__init__(writer=writer, token=token, pyramid=pyramid, buffers=buffers, memory_budget=memory_budget,
+                         cache=cache)
+        self.max_workers = max_workers
+        self.mp_context = mp_context
+        self.pool = pool if pool is not None else SharedMemoryPool()
+        self._processes = None
+        self._threads = None
+
+    def execute(self, plan, factor=1):
+        specs, errors = self.checkPlan(plan, factor)
+        if len(errors) > 0:
+            return {}, errors
+
+        results, handles = {}, {}
+        remaining = {index: len(nodes) for index, nodes in plan.consumers().items()}
+        keys, cached, skipped = self.loadCached(plan, factor)
+        waiting = [node for node in plan if not node.index in skipped]
+        running, footprints = {}, {}
+        donated = self.findDonations(plan)
+
+        while len(waiting) + len(running) > 0 and not self.isCancelled():
+            started = False
+            for node in list(waiting):
+                if node.index in cached.keys():
+                    waiting.remove(node)
+                    started = True
+                    self.nodeStarted(node)
+                    self._finish(node, cached.pop(node.index), factor, results, errors, remaining, handles, donated)
+                    continue
+                if any(not source.index in results.keys() and not source.index in errors.keys() for source in node.sources):
+                    continue
+                if self._isThrottled(node, running):
+                    continue
+                inputs = [results.get(source.index) for source in node.sources]
+                tile_rows = self.tileRows(node, inputs, factor) if node.op != node.OP_INPUT else None
+                footprint = node.estimateMemory(inputs)
+                if node.op == node.OP_INPUT and specs.get(node.index) is not None:
+                    footprint = specs[node.index].nbytes
+                if tile_rows is not None:
+                    footprint = self.memory_budget
+                if not self._admits(footprint, footprints):
+                    continue
+                waiting.remove(node)
+                started = True
+
+                failed = [source.index for source in node.sources if source.index in errors.keys()]
+                if len(failed) > 0:
+                    errors[node.index] = "Upstream item failed"
+                    self.nodeFailed(node, errors[node.index])
+                    self._releaseSources(node, remaining, handles)
+                    continue
+
+                self.nodeStarted(node)
+                placement = self.placement(node) if tile_rows is None else self.PLACE_LOCAL
+                in_place = self._isDonatedTo(node, donated)
+                if placement == self.PLACE_LOCAL:
+                    try:
+                        if node.op == node.OP_INPUT:
+                            result = self.loadInput(node, factor)
+                        else:
+                            result = self.evaluateNode(node, inputs, factor, in_place)
+                    except RunCancelled:
+                        break
+                    except Exception as e:
+                        self._fail(node, e, errors, remaining, handles)
+                    else:
+                        self._finish(node, result, factor, results, errors, remaining, handles, donated, keys)
+                    finally:
+                        self._dropDonated(node, donated, results)
+                elif placement == self.PLACE_THREAD:
+                    future = self._getThreads().submit(node.evaluate, inputs, token=self.token, 
+                        factor=factor, buffers=self.buffers, in_place=in_place)
+                    running[future] = node
+                    footprints[future] = footprint
+                else:
+                    inputs = [self._share(source.index, results, handles) for source in node.sources]
+                    future = self._getProcesses().submit(_evaluateNode, node.detach(), inputs, factor)
+                    running[future] = node
+                    footprints[future] = footprint
+
+            if started or len(running) == 0:
+                continue
+            done, _ = concurrent.futures.wait(running.keys(), return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                footprints.pop(future)
+                try:
+                    result = self._receive(node, future.result(), handles)
+                except RunCancelled:
+                    continue
+                except Exception as e:
+                    self._fail(node, e, errors, remaining, handles)
+                else:
+                    self._finish(node, result, factor, results, errors, remaining, handles, donated, keys)
+                finally:
+                    self._dropDonated(node, donated, results)
+
+        #Cancelled: wait for the running nodes and drop their results
+        for future in running.keys():
+            try:
+                result = future.result()
+            except Exception:
+                continue
+            if isinstance(result, SharedArray):
+                result.unlink()
+        for handle in handles.values():
+            self.pool.release(handle)
+        return results, errors
+
+    def findDonations(self, plan):
+        """ Only donate inputs to nodes running in this process. """
+        consumers = plan.consumers()
+        return set(index for index in super().findDonations(plan)
+                   if self.placement(consumers[index][0]) != self.PLACE_PROCESS)
+
+    def placement(self, node):
+        """ Return where `node` is run, one of the PLACE_* constants. """
+        if node.op == node.OP_INPUT:
+            return self.PLACE_LOCAL
+        if node.op == node.OP_FILTER and not isinstance(node.fn, FilterRef):
+            return self.PLACE_LOCAL
+        if node.capabilities().runsInThread():
+            return self.PLACE_THREAD
+        return self.PLACE_PROCESS
+
+    def shutdown(self):
+        """ Stop the worker processes and threads and unlink all shared memory. """
+        if self._processes is not None:
+            self._processes.shutdown()
+            self._processes = None
+        if self._threads is not None:
+            self._threads.shutdown()
+            self._threads = None
+        self.pool.close()
+
+    def _getProcesses(self):
+        if self._processes is None:
+            self._processes = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=self.mp_context)
+        return self._processes
+
+    def _getThreads(self):
+        if self._threads is None:
+            self._threads = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers or os.cpu_count(), thread_name_prefix='filter_tree')
+        return self._threads
+
+    def _admits(self, footprint, footprints):
+        """ 
+        Return True if a node needing `footprint` bytes may start while
+        nodes needing `footprints` are running. 
+        """
+        if self.memory_budget is None or len(footprints) == 0:
+            return True
+        return sum(footprints.values()) + footprint <= self.memory_budget
+
+    def _isThrottled(self, node, running):
+        """ Return True if `node` would exceed its function's `max_concurrency`. """
+        if node.op == node.OP_INPUT:
+            return False
+        limit = node.capabilities().max_concurrency
+        if limit is None:
+            return False
+        key = self._concurrencyKey(node)
+        return sum(1 for other in running.values() if self._concurrencyKey(other) == key) >= limit
+
+    @staticmethod
+    def _concurrencyKey(node):
+        return node.op if node.op == node.OP_COMBINE else node.fn
+
+    def _share(self, index, results, handles):
+        """ Return the result of node `index` as sent to a worker. """
+        if index in handles.keys():
+            return handles[index]
+        result = results[index]
+        if isinstance(result, np.ndarray) and result.nbytes >= SHARED_MEMORY_THRESHOLD and not result.dtype.hasobject:
+            handles[index] = self.pool.put(result)
+            return handles[index]
+        return result
+
+    def _receive(self, node, result, handles):
+        """ Map a result returned by a worker. """
+        if isinstance(result, SharedArray):
+            handles[node.index] = self.pool.adopt(result)
+            return self.pool.view(result)
+        return result
+
+    def _finish(self, node, result, factor, results, errors, remaining, handles, donated, keys={}):
+        if self.isCancelled():
+            #The run was cancelled while the node ran, its result is obsolete
+            return
+        results[node.index] = result
+        self._checkDonation(node, donated, results)
+        self.storeResult(node, keys, result, factor)
+        try:
+            if factor == 1:
+                self.writeSaves(node, result)
+        except Exception as e:
+            logging.error("Error saving item {}: {}".format(node.name, repr(e)))
+            errors[node.index] = "Saving failed: {}".format(e)
+            self.nodeFailed(node, errors[node.index])
+        else:
+            self.nodeFinished(node, None if node.index in donated else result)
+        self._releaseSources(node, remaining, handles)
+        self._releaseUnused(node.index, remaining, handles)
+
+    def _fail(self, node, error, errors, remaining, handles):
+        logging.error("Error processing item {}: {}".format(node.name, repr(error)))
+        errors[node.index] = str(error)
+        self.nodeFailed(node, errors[node.index])
+        self._releaseSources(node, remaining, handles)
+
+    def _releaseSources(self, node, remaining, handles):
+        for source in node.sources:
+            remaining[source.index] -= 1
+            self._releaseUnused(source.index, remaining, handles)
+
+    def _releaseUnused(self, index, remaining, handles):
+        if remaining[index] <= 0 and index in handles.keys():
+            self.pool.release(handles.pop(index))
+
+
+def physicalMemory():
+    """ Return the size of the physical memory in bytes, or None if unknown. """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+_worker_buffers = None
+
+
+def _evaluateNode(node, inputs, factor):
+    """ Evaluate a detached node in a worker process. """
+    global _worker_buffers
+    if _worker_buffers is None:
+        _worker_buffers = BufferPool()
+    inputs = [source.toArray(readonly=True) if isinstance(source, SharedArray) else source for source in inputs]
+    result = node.evaluate(inputs, factor=factor, buffers=_worker_buffers)
+    packed = packOutput(result)
+    if packed is result and isinstance(result, np.ndarray) and not result.flags.owndata:
+        #Small results may still be views of the shared inputs
+        packed = result.copy()
+    return packed
+
+
+class _ExecutorWorker(QtCore.QObject, Executor):
+    """
+    Runs a plan in a worker thread, reporting progress via signals.
+    Lives in the worker thread, and must not access any items.
+    """
+    signal_node_started = QtCore.pyqtSignal(int, int)
+    signal_node_finished = QtCore.pyqtSignal(int, object, int)
+    signal_node_failed = QtCore.pyqtSignal(int, str, int)
+    signal_progress = QtCore.pyqtSignal(int)
+    signal_preview_done = QtCore.pyqtSignal()
+    signal_done = QtCore.pyqtSignal(bool)
+
+    def __init__(self, plan, writer, pyramid, buffers, cache, preview_factor):
+        QtCore.QObject.__init__(self)
+        Executor.__init__(self, writer=writer, pyramid=pyramid, buffers=buffers, cache=cache)
+        self.plan = plan
+        self.preview_factor = preview_factor
+        self.factor = 1
+        self._passes = [preview_factor, 1] if preview_factor else [1]
+
+    def work(self):
+        try:
+            for factor in self._passes:
+                self.factor = factor
+                self.execute(self.plan, factor=factor)
+                if self.isCancelled():
+                    break
+                if factor != 1:
+                    self.signal_preview_done.emit()
+        finally:
+            self.signal_done.emit(self.isCancelled())
+
+    def nodeStarted(self, node):
+        self.signal_node_started.emit(node.index, self.factor)
+
+    def nodeFinished(self, node, result):
+        self.signal_node_finished.emit(node.index, result, self.factor)
+        self._emitProgress(node)
+
+    def nodeFailed(self, node, message):
+        self.signal_node_failed.emit(node.index, message, self.factor)
+        self._emitProgress(node)
+
+    def _emitProgress(self, node):
+        done = self._passes.index(self.factor) * len(self.plan) + node.index + 1
+        total = len(self._passes) * len(self.plan)
+        self.signal_progress.emit(int(100 * done / max(total, 1)))
+
+
+class ThreadedExecutor(QtCore.QObject):
+    """
+    The `ThreadedExecutor` runs an `ExecutionPlan` in a worker thread,
+    so that the GUI stays responsive.
+
+    The worker reports back through queued signals. Updates of the
+    items' `output`, `is_processed`, `has_processing_error` and
+    `status_message` are collected and applied on the GUI thread in
+    batches every `FLUSH_INTERVAL` milliseconds.
+
+    Starting a run while another one is in progress cancels the obsolete
+    run: its token is cancelled and its remaining updates are dropped. 
+    Use `schedule()` to run the latest state of a tree after bursts of
+    parameter changes have settled for `DEBOUNCE_INTERVAL` milliseconds.
+
+    If `preview_factor` is set (e.g. 4 or 8), each run first processes 
+    the input downsampled by this factor and assigns the preview results
+    to the items, before refining them at full resolution. A run
+    preempted by a newer parameter state never reaches the refinement.
+    Inputs and their downsampled versions are cached in `pyramid`, and
+    output buffers are recycled across runs through `buffers`. Full
+    resolution results are kept in the `ResultCache` if one is given;
+    call `restore()` after loading a tree to show its cached results.
+
+    Signals
+    -------
+    signal_item_started(FilterItem):
+        Emitted when processing of an item starts.
+    signal_item_finished(FilterItem):
+        Emitted when an item was processed and its output was assigned.
+    signal_item_failed(FilterItem, str):
+        Emitted with the error message when processing an item failed.
+    signal_progress(int):
+        Emitted with the percentage of processed plan nodes.
+    signal_preview_finished:
+        Emitted when the preview results of a run were assigned.
+    signal_finished:
+        Emitted when a run completed.
+    signal_cancelled:
+        Emitted when a run was stopped by `cancel()`.
+    """
+    signal_item_started = QtCore.pyqtSignal(object)
+    signal_item_finished = QtCore.pyqtSignal(object)
+    signal_item_failed = QtCore.pyqtSignal(object, str)
+    signal_progress = QtCore.pyqtSignal(int)
+    signal_preview_finished = QtCore.pyqtSignal()
+    signal_finished = QtCore.pyqtSignal()
+    signal_cancelled = QtCore.pyqtSignal()
+
+    FLUSH_INTERVAL = 50
+    DEBOUNCE_INTERVAL = 150
+
+    def __init__(self, writer=None, preview_factor=None, cache=None, *args, **kwargs):
+        """
+        Initialize the `ThreadedExecutor`.
+
+        Parameters
+        ----------
+        writer : filter_tree.save_info.writer.SaveWriter
+            The writer used to save outputs. If None, nothing is saved.
+        preview_factor : int
+            The downsampling factor (a power of two) used for previews.
+            If None, runs are processed at full resolution only.
+        cache : filter_tree.processing.cache.ResultCache
+            The cache results are stored in and loaded from. If None,
+            nothing is cached.
+        """
+        super().__init__(*args, **kwargs)
+        self.writer = writer
+        self.preview_factor = preview_factor
+        self.pyramid = PyramidCache()
+        self.buffers = BufferPool()
+        self.cache = cache
+        self.applier = Executor(cache=cache)
+
+        self._plan = None
+        self._thread = None
+        self._worker = None
+        self._pending = []
+        self._progress = None
+        self._retired = []
+        self._scheduled = None
+
+        self._flush_timer = t = QtCore.QTimer(self)
+        t.setInterval(self.FLUSH_INTERVAL)
+        t.timeout.connect(self._flush)
+
+        self._debounce_timer = t = QtCore.QTimer(self)
+        t.setSingleShot(True)
+        t.setInterval(self.DEBOUNCE_INTERVAL)
+        t.timeout.connect(self._onDebounced)
+
+    def schedule(self, compiler, keep=[]):
+        """
+        Cancel the current run and run the model of `compiler` once no 
+        further call to `schedule()` happened for `DEBOUNCE_INTERVAL`
+        milliseconds. Connect this to e.g. the `FilterModel`'s
+        `signal_parameters_changed`. 
+
+        Parameters
+        ----------
+        compiler : filter_tree.processing.plan.PlanCompiler
+            The compiler used to create the plan once the burst settled
+        keep : list
+            `FilterItems` whose results must be computed, passed
+            on to `PlanCompiler.compile()`
+        """
+        self.cancel()
+        self._scheduled = (compiler, keep)
+        self._debounce_timer.start()
+
+    def start(self, plan):
+        """
+        Start running `plan` in a worker thread, cancelling the current
+        run if there is one.
+        """
+        if self.isRunning():
+            self._retire()
+
+        self._plan = plan
+        self._pending = []
+        self._progress = None
+
+        self._thread = thread = QtCore.QThread()
+        self._worker = worker = _ExecutorWorker(plan, self.writer, self.pyramid, self.buffers, self.cache, self.preview_factor)
+        worker.moveToThread(thread)
+        worker.signal_node_started.connect(self._onNodeStarted)
+        worker.signal_node_finished.connect(self._onNodeFinished)
+        worker.signal_node_failed.connect(self._onNodeFailed)
+        worker.signal_progress.connect(self._onProgress)
+        worker.signal_preview_done.connect(self._onPreviewDone)
+        worker.signal_done.connect(self._onDone)
+        thread.started.connect(worker.work)
+        thread.finished.connect(self._onThreadFinished)
+
+        self._flush_timer.start()
+        thread.start()
+
+    def restore(self, plan):
+        """ 
+        Assign the cached results of `plan` to its items without running
+        anything. Returns the indices of the restored nodes.
+        """
+        restored = self.applier.restore(plan)
+        for index in restored:
+            for item in plan.nodes[index].items:
+                self.signal_item_finished.emit(item)
+        return restored
+
+    def cancel(self):
+        """
+        Request the current run to stop. The run stops after the
+        currently processed node.
+        """
+        self._debounce_timer.stop()
+        if self._worker is not None:
+            self._worker.token.cancel()
+
+    def isRunning(self):
+        return self._thread is not None
+
+    def _retire(self):
+        """
+        Cancel the current run and drop all of its updates. The thread
+        is kept alive until the worker returns from its current node.
+        """
+        worker, thread = self._worker, self._thread
+        worker.token.cancel()
+        worker.signal_node_started.disconnect(self._onNodeStarted)
+        worker.signal_node_finished.disconnect(self._onNodeFinished)
+        worker.signal_node_failed.disconnect(self._onNodeFailed)
+        worker.signal_progress.disconnect(self._onProgress)
+        worker.signal_preview_done.disconnect(self._onPreviewDone)
+        worker.signal_done.disconnect(self._onDone)
+        worker.signal_done.connect(thread.quit)
+        self._retired.append((worker, thread))
+
+        self._thread = self._worker = None
+        self._pending = []
+        self._flush_timer.stop()
+        self.signal_cancelled.emit()
+
+    def _onDebounced(self):
+        compiler, keep = self._scheduled
+        self._scheduled = None
+        self.start(compiler.compile(keep=keep))
+
+    def _onThreadFinished(self):
+        self._retired = [(w, t) for w, t in self._retired if t.isRunning()]
+
+    def wait(self):
+        """ 
+        Block until the current run is done and all updates are applied,
+        while still processing events. 
+        """
+        if not self.isRunning():
+            return
+        loop = QtCore.QEventLoop()
+        self.signal_finished.connect(loop.quit)
+        self.signal_cancelled.connect(loop.quit)
+        loop.exec_()
+        self.signal_finished.disconnect(loop.quit)
+        self.signal_cancelled.disconnect(loop.quit)
+
+    def _onNodeStarted(self, index, factor):
+        self._pending.append(('started', index, None, factor))
+
+    def _onNodeFinished(self, index, result, factor):
+        self._pending.append(('finished', index, result, factor))
+
+    def _onNodeFailed(self, index, message, factor):
+        self._pending.append(('failed', index, message, factor))
+
+    def _onPreviewDone(self):
+        self._pending.append(('preview', None, None, None))
+
+    def _onProgress(self, percent):
+        self._progress = percent
+
+    def _onDone(self, cancelled):
+        self._flush()
+        self._flush_timer.stop()
+        self._thread.quit()
+        self._retired.append((self._worker, self._thread))
+        self._thread = self._worker = None
+        if cancelled:
+            self.signal_cancelled.emit()
+        else:
+            self.signal_finished.emit()
+
+    def _flush(self):
+        """ Apply all pending updates to the items. """
+        pending, self._pending = self._pending, []
+        for event, index, value, factor in pending:
+            if event == 'preview':
+                self.signal_preview_finished.emit()
+                continue
+            node = self._plan.nodes[index]
+            if event == 'started':
+                for item in node.items:
+                    item.status_message = "Processing..."
+                    self.signal_item_started.emit(item)
+            elif event == 'finished':
+                self.applier.applyResult(node, value, factor=factor)
+                for item in node.items:
+                    self.signal_item_finished.emit(item)
+            elif event == 'failed':
+                self.applier.applyResult(node, None, value, factor=factor)
+                for item in node.items:
+                    self.signal_item_failed.emit(item, value)
+
+        if self._progress is not None:
+            self.signal_progress.emit(self._progress)
+            self._progress = None
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import threading
+
+
+class Fingerprinter:
+    """
+    The `Fingerprinter` identifies the content of input files for the
+    keys of cached results. Files of at most `full_hash_size` bytes are
+    hashed entirely, so copies of such a file share their fingerprint.
+
+    Reading larger files entirely would take longer than most filters,
+    so their fingerprint hashes `samples` blocks of `sample_size` bytes
+    spread evenly over the file, including its first and last block,
+    together with the file's size, modification time, device and inode.
+    Changes outside the sampled blocks are thus still detected as long
+    as they change the modification time or replace the file. Copies of
+    large files don't share their fingerprint. The path isn't part of
+    any fingerprint, so renamed files keep theirs.
+
+    Fingerprints are cached per path and recomputed once the size,
+    modification time or inode of the file change, so that repeated
+    runs only cost a `stat()`.
+    """
+    def __init__(self, sample_size=64 << 10, samples=16, full_hash_size=64 << 20):
+        """
+        Initialize the `Fingerprinter`.
+
+        Parameters
+        ----------
+        sample_size : int
+            The size of each sampled block in bytes
+        samples : int
+            The number of sampled blocks, at least 2
+        full_hash_size : int
+            The size in bytes up to which files are hashed entirely.
+        """
+        if samples < 2:
+            raise ValueError("At least 2 samples are needed, not {}!".format(samples))
+        self.sample_size = sample_size
+        self.samples = samples
+        self.full_hash_size = max(full_hash_size, samples * sample_size)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, path):
+        """ Return the fingerprint of the file at `path` as hex string. """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry['signature'] == signature:
+            return entry['fingerprint']
+
+        if stat.st_size <= self.full_hash_size:
+            fingerprint = hashFile(path)
+        else:
+            fingerprint = self._sample(path, stat)
+        with self._lock:
+            self._entries[path] = {'signature': signature, 'fingerprint': fingerprint}
+        return fingerprint
+
+    def invalidate(self, path=None):
+        """ Drop the cached fingerprint of `path`, or of all files if None. """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def _sample(self, path, stat):
+        digest = hashlib.blake2b(digest_size=20)
+        #The file's identity guards against changes between the samples
+        digest.update("{}:{}:{}:{}:".format(stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino).encode())
+        last = stat.st_size - self.sample_size
+        with open(path, 'rb') as fp:
+            for i in range(self.samples):
+                fp.seek(last * i // (self.samples - 1))
+                digest.update(fp.read(self.sample_size))
+        return digest.hexdigest()
+
+
+def hashFile(path, block_size=1 << 20):
+    """ Return the blake2b hash of the entire content of the file at `path`. """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+fingerprinter = Fingerprinter()
@@ -0,0 +1,740 @@
+import hashlib
+import inspect
+import logging
+import os
+
+import numpy as np
+
+import codec
+from filters.capabilities import COMBINE_CAPABILITIES, COMBINE_STRETCH_CAPABILITIES, ArraySpec, FilterCapabilities
+from filters.registry import FilterRef, getCapabilities, makeRef, resolveFunction, toRef
+from processing.buffers import FilterContext
+from processing.fingerprint import fingerprinter
+from save_info.writer import SaveWriter
+from tree.item import FilterItem
+
+
+class PlanNode:
+    """
+    A single step of an `ExecutionPlan`. Each node computes one array
+    from the arrays of its `sources`:
+    - 'input' nodes call `fn(**params)` to load the input
+    - 'filter' nodes call `fn(source, **params)`
+    - 'combine' nodes combine the outputs of a modifier's branches
+    Functions accepting a `token` keyword argument are additionally
+    passed the run's `CancellationToken`, functions accepting `context`
+    a `FilterContext` to allocate their outputs from. Functions given as import 
+    path or registered filter name (see `filters.registry`) are only
+    imported when the node is first evaluated. The executors schedule
+    nodes according to the function's `capabilities()`.
+
+    When computing a downsampled preview, the values of all parameters
+    declared with 'scale_with_resolution' are divided by the 
+    downsampling factor.
+
+    The result of a node is the output of all `FilterItems` in `items`:
+    the item owning the node, plus e.g. the groups or outputs whose
+    result is identical to it.
+    """
+    OP_INPUT = 'input'
+    OP_FILTER = 'filter'
+    OP_COMBINE = 'combine'
+
+    def __init__(self, op, item, sources=[], branch_items=[]):
+        """
+        Initialize the `PlanNode`.
+
+        Parameters
+        ----------
+        op : str
+            One of OP_INPUT, OP_FILTER or OP_COMBINE
+        item : filter_tree.tree.item.FilterItem
+            The item this node is compiled from
+        sources : list
+            The `PlanNodes` whose results are this node's inputs
+        branch_items : list
+            For 'combine' nodes, the first item of each branch, in
+            the same order as `sources`.
+        """
+        self.op = op
+        self.item = item
+        self.items = [item]
+        self.sources = list(sources)
+        self.branch_items = list(branch_items)
+
+        self.index = None
+        self.name = None
+        self.fn = None
+        self.fn_error = None
+        self.params = {}
+        self.scaled_names = []
+        self.coefficients = []
+        self.saves = []
+        self.is_sink = False
+        self._capabilities = None
+
+    def copy(self, sources):
+        """ Return a copy of the node, using `sources` as its sources. """
+        node = PlanNode(self.op, self.item, sources=sources, branch_items=self.branch_items)
+        node.items = list(self.items)
+        return node
+
+    def detach(self):
+        """
+        Return a copy of the bound node without references to items,
+        sources or saves, which can be sent to another process.
+        """
+        node = PlanNode(self.op, None)
+        node.items = []
+        node.index = self.index
+        node.name = self.name
+        node.fn = self.fn
+        node.fn_error = self.fn_error
+        node.params = self.params
+        node.scaled_names = self.scaled_names
+        node.coefficients = self.coefficients
+        return node
+
+    def bind(self):
+        """
+        Take a snapshot of the item's function, parameter values and
+        saves, so that later changes to the item don't affect this node
+        and the node can be run without accessing the item.
+        """
+        self.name = self.item.name
+        try:
+            self.fn = makeRef(self.item.fn)
+            self.fn_error = None
+        except (KeyError, ValueError) as e:
+            #Reported when the node is run, so that only its branch fails
+            self.fn = None
+            self.fn_error = "Invalid function of item {}: {}".format(self.name, e.args[0] if e.args else e)
+        self.params = self.item.param_model.getValues()
+        self.scaled_names = self.item.param_model.getScaledNames()
+        if self.op == self.OP_COMBINE:
+            self.params.setdefault('mode', 'add')
+            self.params.setdefault('clip', True)
+            self.coefficients = [
+                branch_item.param_model.getValues().get('modifier_coefficient', 1.0)
+                for branch_item in self.branch_items]
+        else:
+            self.params.pop('modifier_coefficient', None)
+
+        self.saves = []
+        for item in self.items:
+            paths = item.save_model.getPaths(only_active=True)
+            if len(paths) > 0:
+                name = item.name if item.name else item.id
+                self.saves.append((name, paths, SaveWriter.getProvenance(item)))
+
+    def capabilities(self, resolve=True):
+        """ 
+        Return the `FilterCapabilities` of the node's function. If 
+        `resolve` is False, the function isn't imported to look up
+        capabilities declared on it. 
+        """
+        if self.op == self.OP_COMBINE:
+            return COMBINE_CAPABILITIES if self.params.get('clip', True) else COMBINE_STRETCH_CAPABILITIES
+        if self._capabilities is None:
+            try:
+                capabilities = getCapabilities(self.fn, resolve=resolve)
+            except Exception:
+                #Import errors are reported when the node is evaluated
+                return FilterCapabilities()
+            if not resolve and isinstance(self.fn, FilterRef) and not self.fn.isResolved():
+                return capabilities
+            self._capabilities = capabilities
+        return self._capabilities
+
+    def evaluate(self, inputs, token=None, factor=1, buffers=None, in_place=False):
+        """
+        Compute the node's result from the results of its sources.
+
+        Parameters
+        ----------
+        inputs : list
+            The results of all sources
+        token : filter_tree.processing.executor.CancellationToken
+            The run's token, passed on to functions accepting it
+        factor : int
+            The downsampling factor of the inputs, 1 for full resolution
+        buffers : filter_tree.processing.buffers.BufferPool
+            The pool functions accepting a `context` allocate from
+        in_place : bool
+            If True, the first input isn't used anywhere else, and its
+            memory may be reused for the output.
+        """
+        if self.op == self.OP_COMBINE:
+            return combine(inputs, self.coefficients, mode=self.params['mode'], clip=self.params['clip'])
+
+        if self.fn_error is not None:
+            raise ValueError(self.fn_error)
+        if self.fn is None:
+            raise ValueError("Item {} has no function!".format(self.name))
+        #Filter modules are only imported here, on first execution
+        fn = self.fn.resolve() if isinstance(self.fn, FilterRef) else self.fn
+        params = self.scaledParams(factor)
+        if token is not None and _acceptsKeyword(fn, 'token'):
+            params = dict(params, token=token)
+        if _acceptsKeyword(fn, 'context'):
+            donated = inputs[0] if in_place and len(inputs) > 0 else None
+            params = dict(params, context=FilterContext(buffers, token, factor, donated=donated))
+        if self.op == self.OP_INPUT:
+            return fn(**params)
+        else:
+            return fn(inputs[0], **params)
+
+    def inferSpec(self, specs, factor=1):
+        """
+        Predict the `ArraySpec` of the node's result from the specs of
+        its sources' results, without computing anything. Unknown specs
+        are None.
+
+        Raises a ValueError if the node can't be computed, e.g. if the 
+        branches of a modifier have different shapes or the declared
+        output spec rejects the parameters. Different shapes that are
+        only assumed (see `ArraySpec.exact`) are logged instead.
+        """
+        if self.op == self.OP_COMBINE:
+            if any(spec is None for spec in specs):
+                return None
+            #combine() needs identical shapes, it accumulates in place
+            #into the first output and can't grow it by broadcasting
+            shape = specs[0].shape
+            if any(spec.shape != shape for spec in specs[1:]):
+                message = "Branches of modifier {} have different shapes: {}".format(
+                    self.name, ", ".join(str(spec.shape) for spec in specs))
+                if all(spec.exact for spec in specs):
+                    raise ValueError(message)
+                logging.warning(message)
+                return None
+            return ArraySpec(shape, specs[0].dtype, exact=all(spec.exact for spec in specs))
+
+        declared = self.capabilities().output_spec
+        if declared is not None:
+            declared = resolveFunction(declared)
+        params = self.scaledParams(factor)
+        if self.op == self.OP_INPUT:
+            if declared is None:
+                return None
+            return ArraySpec.fromValue(declared(**params)).downsampled(factor)
+
+        source = specs[0]
+        if source is None:
+            return None
+        if declared is None:
+            return ArraySpec(source.shape, source.dtype, exact=False)
+        return ArraySpec.fromValue(declared(source, **params), exact=source.exact)
+
+    def estimateMemory(self, inputs):
+        """ 
+        Return the predicted peak memory in bytes needed to compute the
+        node from `inputs`, in addition to the inputs themselves. The
+        memory of input nodes isn't known before they are loaded.
+        """
+        arrays = [array for array in inputs if isinstance(array, np.ndarray)]
+        if len(arrays) == 0:
+            return 0
+        if self.op == self.OP_COMBINE:
+            #The weighted branch outputs are accumulated as float64
+            size = max(array.size for array in arrays)
+            return 2 * size * np.dtype(np.float64).itemsize + max(array.nbytes for array in arrays)
+        return int(self.capabilities().memory_factor * max(array.nbytes for array in arrays))
+
+    def tileRows(self, inputs, budget, factor=1):
+        """
+        Return the number of rows per tile so that computing a tile of 
+        `inputs` needs at most `budget` bytes, or None if the node can't
+        be computed in tiles.
+        """
+        capabilities = self.capabilities()
+        if self.op == self.OP_INPUT or not capabilities.tiles or len(inputs) == 0:
+            return None
+        if any(not isinstance(array, np.ndarray) or array.ndim == 0 for array in inputs):
+            return None
+        rows = inputs[0].shape[0]
+        if any(array.shape[0] != rows for array in inputs) or rows < 2:
+            return None
+
+        per_row = max(self.estimateMemory(inputs) / rows, 1)
+        halo = self.scaledHalo(factor)
+        tile_rows = int(budget // per_row) - 2 * halo
+        if tile_rows < 1:
+            return None
+        return min(tile_rows, rows)
+
+    def scaledHalo(self, factor=1):
+        """ Return the tile overlap for inputs downsampled by `factor`. """
+        halo = self.capabilities().halo
+        return -(-halo // factor)
+
+    def evaluateTiled(self, inputs, tile_rows, token=None, factor=1, buffers=None):
+        """
+        Compute the node's result in tiles of `tile_rows` rows of the 
+        inputs, each extended by the function's halo. Only the output
+        array is allocated for the full image. Takes the same arguments
+        as `evaluate()`.
+        """
+        rows = inputs[0].shape[0]
+        halo = self.scaledHalo(factor)
+        output = None
+        for start in range(0, rows, tile_rows):
+            stop = min(start + tile_rows, rows)
+            low, high = max(start - halo, 0), min(stop + halo, rows)
+            tile = self.evaluate([array[low:high] for array in inputs], token=token, factor=factor, buffers=buffers)
+            if not isinstance(tile, np.ndarray) or tile.ndim == 0 or tile.shape[0] != high - low:
+                raise ValueError("Item {} doesn't preserve the number of rows and can't be computed in tiles!".format(self.name))
+            if output is None:
+                shape = (rows,) + tile.shape[1:]
+                output = buffers.empty(shape, tile.dtype) if buffers is not None else np.empty(shape, dtype=tile.dtype)
+            output[start:stop] = tile[start - low:stop - low]
+            del tile
+            if token is not None:
+                token.raiseIfCancelled()
+        return output
+
+    def cacheKey(self, source_keys):
+        """
+        Return the key of the node's result in a `ResultCache`, a hash of
+        the node's function, parameter values and `source_keys`, the keys
+        of its sources. The keys of input nodes identify input files by
+        their `inputFingerprint()` instead of their path, so they are the
+        root of all keys of a tree. 
+        Returns None if the result can't be cached, e.g. for functions
+        that can't be imported by path.
+        """
+        if any(key is None for key in source_keys):
+            return None
+        if self.op == self.OP_COMBINE:
+            fn = self.op
+        else:
+            fn = toRef(self.fn, strict=False)
+            if not isinstance(fn, str):
+                return None
+
+        params, fingerprint = self.params, ''
+        if self.op == self.OP_INPUT:
+            fingerprint = self.inputFingerprint()
+            if fingerprint is None:
+                return None
+            params = {name: value for name, value in params.items() if not _isFile(value)}
+        try:
+            params = codec.dumps(params, sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+
+        digest = hashlib.blake2b(digest_size=20)
+        for part in [CACHE_VERSION, self.op, fn, params, repr(self.coefficients), fingerprint] + list(source_keys):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def inputFingerprint(self):
+        """
+        Return a string identifying the content loaded by an input node,
+        or None if it can't be identified. Parameter values that are
+        paths of existing files are identified by their fingerprint
+        (see `processing.fingerprint`), so that the keys of all results
+        change with the content of the input files.
+        """
+        parts = []
+        for name, value in sorted(self.params.items()):
+            if _isFile(value):
+                try:
+                    parts.append("{}={}".format(name, fingerprinter.fingerprint(value)))
+                except OSError:
+                    return None
+        return ";".join(parts)
+
+    def inputKey(self):
+        """ 
+        Return a hashable key identifying the input loaded by an input
+        node, or None if the node's parameters aren't hashable or the
+        input can't be fingerprinted.
+        """
+        fingerprint = self.inputFingerprint()
+        if fingerprint is None:
+            return None
+        try:
+            key = (self.fn, _freeze(self.params), fingerprint)
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def scaledParams(self, factor):
+        """ Return the parameter values for inputs downsampled by `factor`. """
+        if factor == 1 or len(self.scaled_names) == 0:
+            return self.params
+        params = dict(self.params)
+        for name in self.scaled_names:
+            if not name in params.keys():
+                continue
+            value = params[name]
+            if isinstance(value, int):
+                params[name] = max(int(round(value / factor)), min(value, 1))
+            else:
+                params[name] = value / factor
+        return params
+
+    def __repr__(self):
+        return "<PlanNode {} {} {}>".format(self.index, self.op, self.name)
+
+
+class ExecutionPlan:
+    """
+    The `ExecutionPlan` is the flattened form of a `FilterModel`'s tree:
+    a list of `PlanNodes` in execution order, where every node comes
+    after all of its sources. Use a `PlanCompiler` to create it.
+    """
+    def __init__(self, nodes):
+        self.nodes = nodes
+        for index, node in enumerate(nodes):
+            node.index = index
+
+    def sinks(self):
+        """ Return all nodes whose result is saved or is a tree output. """
+        return [node for node in self.nodes if node.is_sink]
+
+    def inferSpecs(self, inputs={}, factor=1):
+        """
+        Predict the shape and dtype of every node's result without
+        computing anything (a dry run).
+
+        Parameters
+        ----------
+        inputs : dict
+            Known specs of input nodes as node index:`ArraySpec` pairs,
+            at full resolution. Other inputs are predicted from their 
+            declared output spec, if any.
+        factor : int
+            The downsampling factor of the run
+
+        Returns
+        -------
+        specs : dict
+            Dict containing the predicted spec of each node as node 
+            index:`ArraySpec` pairs, None where unknown
+        errors : dict
+            Dict containing the error message of each node that can't be
+            computed as node index:message pairs
+        """
+        specs, errors = {}, {}
+        for node in self.nodes:
+            if any(source.index in errors.keys() for source in node.sources):
+                errors[node.index] = "Upstream item failed"
+                continue
+            try:
+                if node.index in inputs.keys():
+                    specs[node.index] = ArraySpec.fromValue(inputs[node.index]).downsampled(factor)
+                else:
+                    specs[node.index] = node.inferSpec([specs[source.index] for source in node.sources], factor)
+            except Exception as e:
+                errors[node.index] = str(e)
+        return specs, errors
+
+    def cacheKeys(self):
+        """ Return a dict mapping each node's index to its cache key or None. """
+        keys = {}
+        for node in self.nodes:
+            keys[node.index] = node.cacheKey([keys[source.index] for source in node.sources])
+        return keys
+
+    def itemSpecs(self, specs):
+        """ Return a dict mapping the ids of all items to the specs of their results. """
+        return {item.id: specs.get(node.index) for node in self.nodes for item in node.items}
+
+    def consumers(self):
+        """ Return a dict mapping each node's index to the nodes using its result. """
+        consumers = {node.index: [] for node in self.nodes}
+        for node in self.nodes:
+            for source in node.sources:
+                consumers[source.index].append(node)
+        return consumers
+
+    def items(self):
+        """ Return iterable of all `FilterItems` that receive a result. """
+        for node in self.nodes:
+            yield from node.items
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __repr__(self):
+        return "<ExecutionPlan>" + repr(self.nodes)
+
+
+class PlanCompiler:
+    """
+    The `PlanCompiler` compiles the tree of a `FilterModel` into an
+    `ExecutionPlan`.
+
+    Compilation happens in two stages: the structure of the tree is
+    compiled once and kept until the model emits its
+    `signal_structure_changed`. Inactive items, along with inactive
+    groups or modifiers and all their children, are pruned here, and
+    groups and outputs are collapsed into the nodes that compute their
+    results, so that a group with a single active child costs nothing.
+
+    Each call to `compile()` then binds the current parameter values,
+    merges nodes computing the same function with identical parameter 
+    values from the same source (e.g. identical filter sequences at the
+    start of several modifier branches), and drops all nodes whose result
+    feeds neither a tree output nor a save.
+    """
+    def __init__(self, model):
+        """
+        Initialize the `PlanCompiler`.
+
+        Parameters
+        ----------
+        model : filter_tree.tree.model.FilterModel
+            The model to compile.
+        """
+        self.model = model
+        self._skeleton = None
+        self._last = None
+
+        model.signal_structure_changed.connect(self.invalidate)
+
+    def invalidate(self):
+        """ Drop the compiled structure, forcing recompilation. """
+        self._skeleton = None
+
+    def compile(self, keep=[]):
+        """
+        Return an `ExecutionPlan` for the current state of the model.
+
+        Parameters
+        ----------
+        keep : list
+            `FilterItems` whose results must be computed even if they
+            aren't saved, e.g. the item currently shown in a view.
+
+        Returns
+        -------
+        plan : ExecutionPlan
+            The compiled plan.
+        """
+        if self._skeleton is None:
+            self._skeleton, self._last = self._compileStructure()
+
+        #Copy the skeleton, so that binding doesn't affect it
+        copies = {}
+        for node in self._skeleton:
+            copies[id(node)] = copy = node.copy([copies[id(source)] for source in node.sources])
+            copy.bind()
+            copy.is_sink = self._isSink(copy, keep)
+        nodes = [copies[id(node)] for node in self._skeleton]
+
+        if not any(node.is_sink for node in nodes) and self._last is not None:
+            copies[id(self._last)].is_sink = True
+
+        nodes = self._eliminateCommon(nodes)
+        return ExecutionPlan(self._pruneDead(nodes))
+
+    def _compileStructure(self):
+        nodes = []
+        last = self._compileItems(self.model.topLevelItems(), None, nodes)
+        return nodes, last
+
+    def _compileItems(self, items, upstream, nodes):
+        for item in items:
+            upstream = self._compileItem(item, upstream, nodes)
+        return upstream
+
+    def _compileItem(self, item, upstream, nodes):
+        """
+        Compile `item` and its children, appending the new nodes to
+        `nodes`. Return the node computing the item's result.
+        """
+        t = item.type
+        if t == FilterItem.TYPE_INPUT:
+            node = PlanNode(PlanNode.OP_INPUT, item)
+            nodes.append(node)
+            return node
+
+        if not item.is_active or t == FilterItem.TYPE_GENERIC:
+            return upstream
+        if upstream is None:
+            raise ValueError("Item {} comes before the input item!".format(item.name))
+
+        if t == FilterItem.TYPE_FILTER:
+            node = PlanNode(PlanNode.OP_FILTER, item, sources=[upstream])
+            nodes.append(node)
+            return node
+
+        elif t == FilterItem.TYPE_GROUP:
+            node = self._compileItems(item.children(), upstream, nodes)
+            node.items.append(item)
+            return node
+
+        elif t == FilterItem.TYPE_MODIFIER:
+            sources, branch_items = [], []
+            for child in item.children():
+                if not child.is_active:
+                    continue
+                sources.append(self._compileItem(child, upstream, nodes))
+                branch_items.append(child)
+            if len(sources) == 0:
+                upstream.items.append(item)
+                return upstream
+            node = PlanNode(PlanNode.OP_COMBINE, item, sources=sources, branch_items=branch_items)
+            nodes.append(node)
+            return node
+
+        elif t == FilterItem.TYPE_OUTPUT:
+            #The output's children form a side branch starting at the output
+            upstream.items.append(item)
+            self._compileItems(item.children(), upstream, nodes)
+            return upstream
+
+        else:
+            raise ValueError("Invalid item type: {}".format(t))
+
+    @staticmethod
+    def _isSink(node, keep):
+        if len(node.saves) > 0:
+            return True
+        for item in node.items:
+            if item.type == FilterItem.TYPE_OUTPUT:
+                return True
+            if any(item is kept for kept in keep):
+                return True
+        return False
+
+    @staticmethod
+    def _eliminateCommon(nodes):
+        """
+        Merge all nodes that compute the same function with the same
+        parameter values from the same sources. As nodes are visited in
+        execution order, merging a node lets identical nodes using its
+        result merge as well, so that entire identical chains collapse.
+        """
+        unique = {}
+        replaced = {}
+        retval = []
+        for node in nodes:
+            node.sources = [replaced.get(id(source), source) for source in node.sources]
+            try:
+                key = (node.op, node.fn, node.fn_error, _freeze(node.params), tuple(node.coefficients),
+                       tuple(id(source) for source in node.sources))
+                hash(key)
+            except TypeError:
+                #Unhashable function or parameter value: never merge
+                retval.append(node)
+                continue
+
+            if key in unique.keys():
+                common = unique[key]
+                common.items.extend(node.items)
+                common.saves.extend(node.saves)
+                common.is_sink = common.is_sink or node.is_sink
+                replaced[id(node)] = common
+            else:
+                unique[key] = node
+                retval.append(node)
+        return retval
+
+    @staticmethod
+    def _pruneDead(nodes):
+        """ Return all nodes that (indirectly) feed a sink. """
+        alive = set()
+        for node in reversed(nodes):
+            if node.is_sink or id(node) in alive:
+                alive.add(id(node))
+                alive.update(id(source) for source in node.sources)
+        return [node for node in nodes if id(node) in alive]
+
+
+#Changing how results are computed invalidates all cached results
+CACHE_VERSION = '1'
+
+_KEYWORD_CACHE = {}
+
+def _acceptsKeyword(fn, name):
+    """ Return True if `fn` explicitly accepts the keyword argument `name`. """
+    try:
+        return _KEYWORD_CACHE[(fn, name)]
+    except KeyError:
+        pass
+    except TypeError:
+        #Unhashable callable, can't be cached
+        return _inspectKeyword(fn, name)
+    accepts = _KEYWORD_CACHE[(fn, name)] = _inspectKeyword(fn, name)
+    return accepts
+
+
+def _inspectKeyword(fn, name):
+    try:
+        parameters = inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+    if not name in parameters.keys():
+        return False
+    return parameters[name].kind in [inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY]
+
+
+def _isFile(value):
+    return isinstance(value, str) and os.path.isfile(value)
+
+
+def _freeze(value):
+    """ Return a hashable representation of a parameter value. """
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(v)) for key, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def combine(images, coefficients, mode='add', clip=True):
+    """
+    Combine the outputs of a modifier's branches.
+
+    Parameters
+    ----------
+    images : list
+        The branch outputs, all of identical shape
+    coefficients : list
+        The coefficient each branch output is multiplied with
+    mode : str
+        'add' to sum the weighted outputs, 'multiply' to multiply them
+    clip : bool
+        If True, clip the result to the range of the first output's
+        dtype, otherwise stretch the result to the range.
+
+    Returns
+    -------
+    result : numpy.ndarray
+        The combined output, with the dtype of the first output.
+    """
+    dtype = images[0].dtype
+    result = None
+    for image, coefficient in zip(images, coefficients):
+        weighted = image.astype(np.float64) * coefficient
+        if result is None:
+            result = weighted
+        elif mode == 'add':
+            result += weighted
+        elif mode == 'multiply':
+            result *= weighted
+        else:
+            raise ValueError("Invalid modifier mode: {}".format(mode))
+
+    if np.issubdtype(dtype, np.integer):
+        low, high = np.iinfo(dtype).min, np.iinfo(dtype).max
+    else:
+        low, high = 0.0, 1.0
+    if clip:
+        np.clip(result, low, high, out=result)
+    else:
+        minimum, maximum = result.min(), result.max()
+        if maximum > minimum:
+            result = (result - minimum) * ((high - low) / (maximum - minimum)) + low
+        else:
+            result[...] = low
+    return result.astype(dtype)
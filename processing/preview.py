@@ -0,0 +1,97 @@
+import collections
+import threading
+
+import numpy as np
+
+
+class PyramidCache:
+    """
+    The `PyramidCache` keeps the most recently used inputs together with
+    their downsampled versions (pyramid levels), so that previews of a
+    tree can be computed without reloading and downsampling the input
+    on every run.
+
+    Levels are downsampled by powers of two using area averaging, each
+    level being computed from the previous one. The cache may be used
+    from several threads.
+    """
+    def __init__(self, max_inputs=4):
+        """
+        Initialize the `PyramidCache`.
+
+        Parameters
+        ----------
+        max_inputs : int
+            The number of inputs (including their levels) to keep.
+        """
+        self.max_inputs = max_inputs
+        self._pyramids = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, load, factor=1):
+        """
+        Return the input identified by `key`, downsampled by `factor`.
+
+        Parameters
+        ----------
+        key : hashable
+            Identifies the input, e.g. the input path
+        load : callable
+            Called without arguments to load the full resolution input
+            if it isn't cached yet.
+        factor : int
+            The downsampling factor, a power of two.
+
+        Returns
+        -------
+        array : numpy.ndarray
+            The downsampled input
+        """
+        if factor < 1 or factor & (factor - 1) != 0:
+            raise ValueError("Downsampling factor must be a power of two, not {}!".format(factor))
+
+        with self._lock:
+            pyramid = self._pyramids.get(key)
+            if pyramid is not None:
+                self._pyramids.move_to_end(key)
+        if pyramid is None:
+            pyramid = {1: load()}
+
+        level = 1
+        while level < factor and level * 2 in pyramid.keys():
+            level *= 2
+        while level < factor:
+            pyramid[level * 2] = downsample(pyramid[level], 2)
+            level *= 2
+
+        with self._lock:
+            self._pyramids[key] = pyramid
+            self._pyramids.move_to_end(key)
+            while len(self._pyramids) > self.max_inputs:
+                self._pyramids.popitem(last=False)
+        return pyramid[factor]
+
+    def clear(self):
+        """ Drop all cached inputs. """
+        with self._lock:
+            self._pyramids.clear()
+
+
+def downsample(array, factor):
+    """
+    Downsample the first two axes of `array` by the integer `factor`
+    using area averaging. Rows and columns that don't fill an entire
+    block are dropped.
+    """
+    if factor == 1:
+        return array
+    height, width = array.shape[0] // factor, array.shape[1] // factor
+    if height == 0 or width == 0:
+        raise ValueError("Cannot downsample array of shape {} by {}!".format(array.shape, factor))
+
+    cropped = array[:height * factor, :width * factor]
+    blocks = cropped.reshape((height, factor, width, factor) + array.shape[2:])
+    result = blocks.mean(axis=(1, 3))
+    if np.issubdtype(array.dtype, np.integer):
+        result = np.rint(result)
+    return result.astype(array.dtype)
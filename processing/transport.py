@@ -0,0 +1,330 @@
+import io
+import pickle
+import threading
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+
+#Arrays at least this large are sent through shared memory
+SHARED_MEMORY_THRESHOLD = 1 << 20
+
+
+class SharedArray:
+    """
+    A `SharedArray` is a handle to an array stored in a shared memory
+    segment. Only the handle (the segment's name, the array's shape,
+    dtype and byte offset in the segment) is pickled, so large arrays
+    can be sent to other processes without pickling their data. 
+
+    Segments created with `fromArray()` belong to the handle: whoever
+    receives it either attaches to it with `toArray()` and then calls 
+    `unlink()`, or uses `unpackOutput()`, which does both. Handles 
+    created by a `SharedMemoryPool` are owned by the pool. 
+    """
+    def __init__(self, name, shape, dtype, offset=0):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).str
+        self.offset = offset
+
+    @classmethod
+    def fromArray(cls, array):
+        """ Copy `array` into a new shared memory segment. """
+        array = np.asarray(array)
+        if array.dtype.hasobject:
+            raise TypeError("Cannot share arrays of dtype object!")
+        shm = _openSharedMemory(size=max(array.nbytes, 1))
+        try:
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+            shared[...] = array
+            del shared
+        finally:
+            shm.close()
+        return cls(shm.name, array.shape, array.dtype)
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+    def toArray(self, unlink=False, readonly=False):
+        """ 
+        Attach to the segment and return the array. No data is copied;
+        the segment stays mapped as long as the array is referenced. 
+        If `unlink` is True, the segment is freed once it is unmapped.
+        """
+        shm = _openSharedMemory(name=self.name)
+        array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf, offset=self.offset)
+        weakref.finalize(array, shm.close)
+        if readonly:
+            array.flags.writeable = False
+        if unlink:
+            _track(shm)
+            shm.unlink()
+        return array
+
+    def unlink(self):
+        """ 
+        Free the segment once it is no longer mapped. Arrays returned by
+        `toArray()` stay valid. 
+        """
+        try:
+            shm = _openSharedMemory(name=self.name)
+        except FileNotFoundError:
+            return
+        _track(shm)
+        shm.unlink()
+        shm.close()
+
+    def __repr__(self):
+        return "SharedArray({!r}, {}, {!r}, {})".format(self.name, self.shape, self.dtype, self.offset)
+
+
+class SharedMemoryPool:
+    """
+    The `SharedMemoryPool` places arrays in shared memory segments of
+    `segment_size` bytes, packing several arrays into one segment at 
+    different offsets. Larger arrays get a segment of their own. 
+
+    A block is reclaimed once it was released with `release()` and all 
+    arrays returned by `view()` for it were garbage collected. Segments
+    without live blocks are reused; up to `max_idle_segments` of them
+    are kept, the rest are unlinked. Call `close()` to unlink all 
+    segments when the pool isn't needed anymore. 
+
+    The pool may be used from several threads. 
+    """
+    ALIGNMENT = 64
+
+    def __init__(self, segment_size=64 << 20, max_idle_segments=2):
+        """
+        Initialize the `SharedMemoryPool`.
+
+        Parameters
+        ----------
+        segment_size : int
+            The size of newly created segments in bytes
+        max_idle_segments : int
+            The number of segments without live blocks that are kept
+            for reuse.
+        """
+        self.segment_size = segment_size
+        self.max_idle_segments = max_idle_segments
+        self._segments = {}
+        self._blocks = {}
+        self._lock = threading.RLock()
+
+    def put(self, array):
+        """ Copy `array` into the pool and return its handle. """
+        array = np.asarray(array)
+        handle = self.allocate(array.shape, array.dtype)
+        view = self.view(handle)
+        view[...] = array
+        return handle
+
+    def allocate(self, shape, dtype):
+        """ Return the handle of a new, uninitialized block. """
+        dtype = np.dtype(dtype)
+        if dtype.hasobject:
+            raise TypeError("Cannot share arrays of dtype object!")
+        nbytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        with self._lock:
+            segment = self._findSegment(nbytes)
+            offset = segment['used']
+            segment['used'] = offset + -(-nbytes // self.ALIGNMENT) * self.ALIGNMENT
+            segment['live'] += 1
+            handle = SharedArray(segment['shm'].name, shape, dtype, offset)
+            self._blocks[self._key(handle)] = 1
+        return handle
+
+    def adopt(self, handle):
+        """ 
+        Take ownership of the segment of a handle created with 
+        `SharedArray.fromArray()`, e.g. by a worker process. The segment
+        is unlinked once the block is reclaimed. 
+        """
+        shm = _openSharedMemory(name=handle.name)
+        with self._lock:
+            self._segments[handle.name] = {'shm': shm, 'used': shm.size, 'live': 1, 'adopted': True}
+            self._blocks[self._key(handle)] = 1
+        return handle
+
+    def view(self, handle):
+        """ 
+        Return the array of `handle`, mapped in this process. The block
+        isn't reclaimed while the returned array is alive. 
+        """
+        with self._lock:
+            key = self._key(handle)
+            if not key in self._blocks.keys():
+                raise KeyError("Block {} isn't part of the pool!".format(handle))
+            segment = self._segments[handle.name]
+            self._blocks[key] += 1
+        array = np.ndarray(handle.shape, dtype=handle.dtype, buffer=segment['shm'].buf, offset=handle.offset)
+        #Also keeps the segment mapped while the view is alive
+        weakref.finalize(array, self._unref, key, segment['shm'])
+        return array
+
+    def release(self, handle):
+        """ Release the block of `handle` once no view of it is left. """
+        self._unref(self._key(handle))
+
+    def close(self):
+        """ Unlink all segments. Views that are still alive stay valid. """
+        with self._lock:
+            for segment in self._segments.values():
+                self._unlink(segment)
+            self._segments.clear()
+            self._blocks.clear()
+
+    def stats(self):
+        """ 
+        Return a dict with the number of 'segments', the number of live
+        'blocks' and the 'reserved' bytes of all segments. 
+        """
+        with self._lock:
+            return {
+                'segments': len(self._segments),
+                'blocks': len(self._blocks),
+                'reserved': sum(segment['shm'].size for segment in self._segments.values()),
+            }
+
+    def _findSegment(self, nbytes):
+        for segment in self._segments.values():
+            if not segment['adopted'] and segment['shm'].size - segment['used'] >= nbytes:
+                return segment
+        shm = _openSharedMemory(size=max(nbytes, self.segment_size))
+        segment = self._segments[shm.name] = {'shm': shm, 'used': 0, 'live': 0, 'adopted': False}
+        return segment
+
+    def _unref(self, key, shm=None):
+        with self._lock:
+            if not key in self._blocks.keys():
+                return
+            self._blocks[key] -= 1
+            if self._blocks[key] > 0:
+                return
+            del self._blocks[key]
+            segment = self._segments.get(key[0])
+            segment['live'] -= 1
+            if segment['live'] > 0:
+                return
+
+            idle = [s for s in self._segments.values() if s['live'] == 0 and not s['adopted']]
+            if segment['adopted'] or len(idle) > self.max_idle_segments:
+                del self._segments[key[0]]
+                self._unlink(segment)
+            else:
+                segment['used'] = 0
+
+    @staticmethod
+    def _key(handle):
+        return (handle.name, handle.offset)
+
+    @staticmethod
+    def _unlink(segment):
+        shm = segment['shm']
+        _track(shm)
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            #Still mapped by live views, closed when they are collected
+            pass
+
+
+def packOutput(output, threshold=SHARED_MEMORY_THRESHOLD):
+    """
+    Return `output` in a form suitable for pickling: numpy arrays of at
+    least `threshold` bytes are replaced by a `SharedArray`, anything 
+    else is returned unchanged. 
+    """
+    if isinstance(output, np.ndarray) and output.nbytes >= threshold and not output.dtype.hasobject:
+        return SharedArray.fromArray(output)
+    return output
+
+
+def unpackOutput(output):
+    """ Reverse `packOutput()`, freeing the shared memory segment. """
+    if isinstance(output, SharedArray):
+        return output.toArray(unlink=True)
+    return output
+
+
+def dumpsShared(obj, pool, threshold=SHARED_MEMORY_THRESHOLD):
+    """
+    Pickle `obj`, e.g. a tree of `FilterItem`, placing all numpy arrays
+    of at least `threshold` bytes in blocks of `pool` instead of the
+    pickle. Returns the pickle and the list of handles of these blocks.
+
+    The blocks belong to the caller, who releases them with
+    `pool.release()` once no receiver uses the loaded arrays anymore,
+    since the pool may reuse released blocks. Until then, the pickle
+    can be loaded any number of times with `loadsShared()`.
+    """
+    handles = []
+    fp = io.BytesIO()
+    _SharedPickler(fp, pool, threshold, handles).dump(obj)
+    return fp.getvalue(), handles
+
+
+def loadsShared(data, readonly=False):
+    """
+    Load a pickle created by `dumpsShared()`. Arrays are mapped from
+    shared memory without copying, copy them to keep them after the
+    sender released their blocks.
+    """
+    return _SharedUnpickler(io.BytesIO(data), readonly).load()
+
+
+class _SharedPickler(pickle.Pickler):
+    def __init__(self, fp, pool, threshold, handles):
+        super().__init__(fp, protocol=pickle.HIGHEST_PROTOCOL)
+        self.pool = pool
+        self.threshold = threshold
+        self.handles = handles
+
+    def persistent_id(self, obj):
+        if type(obj) is np.ndarray and obj.nbytes >= self.threshold and not obj.dtype.hasobject:
+            handle = self.pool.put(obj)
+            self.handles.append(handle)
+            return handle
+        return None
+
+
+class _SharedUnpickler(pickle.Unpickler):
+    def __init__(self, fp, readonly):
+        super().__init__(fp)
+        self.readonly = readonly
+
+    def persistent_load(self, handle):
+        return handle.toArray(readonly=self.readonly)
+
+
+def _openSharedMemory(name=None, size=0):
+    #Segments are owned by their SharedArray handles, not by the process
+    #that happened to open them, so keep the resource tracker out of it
+    try:
+        return shared_memory.SharedMemory(name=name, create=name is None, size=size, track=False)
+    except TypeError:
+        #Before Python 3.13, every SharedMemory registers itself
+        shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        _untrack(shm)
+        return shm
+
+
+def _untrack(shm):
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except (AttributeError, TypeError):
+        pass
+
+
+def _track(shm):
+    #SharedMemory.unlink() unregisters the segment itself before 3.13
+    if not hasattr(shm, '_track') or shm._track:
+        try:
+            resource_tracker.register(shm._name, 'shared_memory')
+        except (AttributeError, TypeError):
+            pass
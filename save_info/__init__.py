@@ -1,6 +1,22 @@
 
 from save_info.item import Save
 from save_info.model import SaveModel
-from save_info.widgets import SaveView, SaveControls
+from save_info.writer import SaveWriter
 
-__all__ = [Save, SaveModel, SaveView, SaveControls]
\ No newline at end of file
+__all__ = ['Save', 'SaveModel', 'SaveView', 'SaveControls', 'SaveWriter']
+
+#Widgets are only imported once requested, so that the models can be 
+#used without loading QtWidgets
+_WIDGETS = {
+    'SaveView': 'save_info.widgets',
+    'SaveControls': 'save_info.widgets',
+}
+
+
+def __getattr__(name):
+    if name in _WIDGETS.keys():
+        import importlib
+        value = getattr(importlib.import_module(_WIDGETS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -1,5 +1,5 @@
 
-from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5 import QtCore, QtGui
 
 
 class TypeItem(QtGui.QStandardItem):
@@ -115,7 +115,46 @@ class Save(QtCore.QObject):
     The `Save` object is used to store all information associated
     with a save entry. It has two members, `type_item` and `path_item`, 
     which are used to populate a `SaveModel`. 
+
+    The properties each save type accepts are declared in `PROPERTIES`
+    as name: (type, default, options or (minimum, maximum)) entries:
+    - 'format': the encoding format ('png', 'tiff' or 'npy')
+    - 'compression': the codec, 'default', 'none', 'deflate' (png) or 
+      'lzw' (tiff), see `COMPRESSIONS` for the codecs of each format
+    - 'level': the compression level (png only), -1 to use the codec's
+      default
+    - 'bit_depth': 8 or 16 bits per channel, 0 to keep the output's
+    - 'chunk_size': the block size in bytes used for writing/uploading
+    - 'encoder_threads': the number of formats encoded in parallel
+    - 'timeout' (web only): the upload timeout in seconds
     """
+    _COMMON_PROPERTIES = {
+        'format': (str, 'png', ['png', 'tiff', 'npy']),
+        'compression': (str, 'default', ['default', 'none', 'deflate', 'lzw']),
+        'level': (int, -1, (-1, 9)),
+        'bit_depth': (int, 0, [0, 8, 16]),
+        'chunk_size': (int, 1 << 20, (1 << 12, 1 << 30)),
+        'encoder_threads': (int, 1, (1, 64)),
+    }
+    PROPERTIES = {
+        'disk': dict(_COMMON_PROPERTIES),
+        'web': dict(_COMMON_PROPERTIES, timeout=(float, 30.0, (0.1, 3600.0))),
+    }
+    #Format: compressions it can be encoded with
+    COMPRESSIONS = {
+        'png': ['default', 'none', 'deflate'],
+        'tiff': ['default', 'none', 'lzw'],
+        'npy': ['default', 'none'],
+    }
+    #Formats whose compression level can be set
+    LEVEL_FORMATS = ['png']
+    PROPERTY_ALIASES = {
+        'tif': 'tiff',
+        'numpy': 'npy',
+        'mmap': 'npy',
+        'zlib': 'deflate',
+    }
+
     def __init__(self, opts):
         """
         Initialize the `Parameter` object.
@@ -127,7 +166,9 @@ class Save(QtCore.QObject):
             - 'type': either 'disk' or 'web'
             - 'path' (optional): the save path or url
             - 'is_active' (optional): True or False 
-            - 'properties' (optional)
+            - 'properties' (optional): a dict containing information
+              like 'format', 'compression', 'level', ... 
+              See `Save.PROPERTIES` for all properties per save type.
         """
         super().__init__()
         self.opts = opts = self._verifyOpts(opts)
@@ -219,16 +260,49 @@ class Save(QtCore.QObject):
             raise ValueError("Invalid parameter type: {}".format(t))
 
     def _fixupProperties(self, t, p):
-        keys = p.keys()
-
-        if t == 'disk':
-            p = {}
-        elif t == 'web':
-            p = {}
-        else:
+        if not t in self.PROPERTIES.keys():
             raise ValueError("Invalid parameter type: {}".format(t))
-
-        return p 
+        schema = self.PROPERTIES[t]
+
+        for key in p.keys():
+            if not key in schema.keys():
+                raise ValueError("Invalid property for {} saves: {}".format(t, key))
+
+        fixed = {}
+        for key, (dtype, default, limits) in schema.items():
+            if not key in p.keys():
+                fixed[key] = default
+                continue
+
+            value = p[key]
+            if dtype == str:
+                if not isinstance(value, str):
+                    raise TypeError("Save property {} must be passed as string, not {}!".format(key, type(value)))
+                value = value.lower().strip()
+                value = self.PROPERTY_ALIASES.get(value, value)
+            elif dtype == int:
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise TypeError("Save property {} must be passed as int, not {}!".format(key, type(value)))
+            elif dtype == float:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise TypeError("Save property {} must be passed as float, not {}!".format(key, type(value)))
+                value = float(value)
+
+            if isinstance(limits, list):
+                if not value in limits:
+                    raise ValueError("Invalid value for save property {}: {}".format(key, value))
+            elif not limits[0] <= value <= limits[1]:
+                raise ValueError("Save property {} must be between {} and {}, not {}!".format(key, limits[0], limits[1], value))
+            fixed[key] = value
+
+        if not fixed['compression'] in self.COMPRESSIONS[fixed['format']]:
+            raise ValueError("Invalid compression for {} saves: {}".format(fixed['format'], fixed['compression']))
+        if fixed['level'] != -1 and not fixed['format'] in self.LEVEL_FORMATS:
+            raise ValueError("{} saves have no compression level, got level {}!".format(fixed['format'], fixed['level']))
+        return fixed 
+
+    def __reduce__(self):
+        return (Save, (self.serialize(),))
 
     def __repr__(self):
         return str(self.serialize())
@@ -1,5 +1,7 @@
 
-from PyQt5 import QtCore, QtGui, QtWidgets
+import contextlib
+
+from PyQt5 import QtCore, QtGui
 
 from save_info.item import PathItem, Save, TypeItem
 
@@ -25,6 +27,10 @@ class SaveModel(QtGui.QStandardItemModel):
         Emitted when a `Save` is removed from the model. 
     signal_model_change:
         Emitted when any of the above signals is emitted. 
+
+    Wrap bulk changes in `batchUpdate()` (or `beginUpdate()` and 
+    `endUpdate()`) to suppress the per-save signals and emit a single
+    `signal_model_change` at the end instead.
     """
     signal_save_changed = QtCore.pyqtSignal(Save)
     signal_save_added = QtCore.pyqtSignal(Save)
@@ -49,6 +55,8 @@ class SaveModel(QtGui.QStandardItemModel):
         self.setHeaderData(0, QtCore.Qt.Horizontal, "Location")
         self.setHeaderData(1, QtCore.Qt.Horizontal, "Path")
         
+        self._update_depth = 0
+        self._update_changed = False
         self.saves = []
         self._loadItems(saves_list)
 
@@ -60,13 +68,56 @@ class SaveModel(QtGui.QStandardItemModel):
         self._readonly = False
 
     def setReadonly(self, readonly=True):
+        if readonly == self._readonly:
+            return
         self._readonly = readonly
-        for save in self.saves: 
-            save.setReadonly(readonly=readonly)
+
+        #Flag changes aren't save changes: block the per-item signals
+        #and let attached views relayout once instead. Emitting dataChanged
+        #would make the model emit itemChanged for every item again.
+        self.layoutAboutToBeChanged.emit()
+        blocked = self.blockSignals(True)
+        try:
+            for save in self.saves: 
+                save.setReadonly(readonly=readonly)
+        finally:
+            self.blockSignals(blocked)
+        self.layoutChanged.emit()
 
     def isReadonly(self):
         return self._readonly
 
+    def beginUpdate(self):
+        """ 
+        Start a bulk update. Until the matching `endUpdate()`, no 
+        save signals are emitted. Calls can be nested. 
+        """
+        self._update_depth += 1
+
+    def endUpdate(self):
+        """ 
+        End a bulk update, emitting `signal_model_change` once if any
+        save was added, removed or changed during the update. 
+        """
+        if self._update_depth == 0:
+            raise RuntimeError("endUpdate() called without beginUpdate()!")
+        self._update_depth -= 1
+        if self._update_depth == 0 and self._update_changed:
+            self._update_changed = False
+            self.signal_model_change.emit()
+
+    def isUpdating(self):
+        return self._update_depth > 0
+
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """ Context manager wrapping `beginUpdate()` and `endUpdate()`. """
+        self.beginUpdate()
+        try:
+            yield self
+        finally:
+            self.endUpdate()
+
     def getPaths(self, only_active=True):
         """
         Return a dictionary containing all save entries. 
@@ -80,8 +131,8 @@ class SaveModel(QtGui.QStandardItemModel):
         Returns
         -------
         paths : list
-            List containing dictionaries with 'type' and 'path' entries
-            for each `Save` in the model. 
+            List containing dictionaries with 'type', 'path' and
+            'properties' entries for each `Save` in the model. 
         """
         paths = []
         for save in self.saves:
@@ -89,7 +140,8 @@ class SaveModel(QtGui.QStandardItemModel):
                 continue
             save_info = {
                 'type': save.type, 
-                'path': save.path
+                'path': save.path,
+                'properties': save.properties
             }
             paths.append(save_info)
         return paths 
@@ -118,7 +170,10 @@ class SaveModel(QtGui.QStandardItemModel):
         
         self.saves.append(save)
         self.appendRow([save.type_item, save.path_item])
-        self.signal_save_added.emit(save)
+        if self.isUpdating():
+            self._update_changed = True
+        else:
+            self.signal_save_added.emit(save)
             
     def removeSave(self, save):
         """
@@ -137,12 +192,19 @@ class SaveModel(QtGui.QStandardItemModel):
         
         row = save.type_item.row()
         self.takeRow(row)
-        self.signal_save_removed.emit()
+        if self.isUpdating():
+            self._update_changed = True
+        else:
+            self.signal_save_removed.emit()
 
     def _onItemChange(self, item):
-        self.signal_save_changed.emit(item.save)
+        if self.isUpdating():
+            self._update_changed = True
+        else:
+            self.signal_save_changed.emit(item.save)
 
     def _loadItems(self, saves_list):
+        #Nothing is connected yet, so there are no signals to coalesce
         for save_opts in saves_list:
             save = Save(save_opts)
             self.addSave(save)
@@ -161,7 +223,7 @@ class SaveModel(QtGui.QStandardItemModel):
             - 'type': either 'disk' or 'web'
             - 'path' (optional): the save path or url
             - 'is_active' (optional): True or False 
-            - 'properties' (optional)
+            - 'properties' (optional): see `Save.PROPERTIES`
 
         Returns
         -------
@@ -172,6 +234,9 @@ class SaveModel(QtGui.QStandardItemModel):
 
         return obj
 
+    def __reduce__(self):
+        return (SaveModel.createModel, (self.serialize(),))
+
     def __repr__(self):
         return str(self.serialize())
 
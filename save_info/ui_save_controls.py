@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'save_info/save_controls.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Form(object):
+    def setupUi(self, Form):
+        Form.setObjectName("Form")
+        Form.resize(406, 47)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(Form.sizePolicy().hasHeightForWidth())
+        Form.setSizePolicy(sizePolicy)
+        self.horizontalLayout = QtWidgets.QHBoxLayout(Form)
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.label_25 = QtWidgets.QLabel(Form)
+        self.label_25.setObjectName("label_25")
+        self.horizontalLayout.addWidget(self.label_25)
+        spacerItem = QtWidgets.QSpacerItem(58, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout.addItem(spacerItem)
+        self.cb_save_to = QtWidgets.QComboBox(Form)
+        self.cb_save_to.setObjectName("cb_save_to")
+        self.cb_save_to.addItem("")
+        self.cb_save_to.addItem("")
+        self.horizontalLayout.addWidget(self.cb_save_to)
+        self.pb_add_save = QtWidgets.QPushButton(Form)
+        self.pb_add_save.setObjectName("pb_add_save")
+        self.horizontalLayout.addWidget(self.pb_add_save)
+        self.line = QtWidgets.QFrame(Form)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Preferred)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.line.sizePolicy().hasHeightForWidth())
+        self.line.setSizePolicy(sizePolicy)
+        self.line.setFrameShape(QtWidgets.QFrame.VLine)
+        self.line.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line.setObjectName("line")
+        self.horizontalLayout.addWidget(self.line)
+        self.pb_remove_save = QtWidgets.QPushButton(Form)
+        self.pb_remove_save.setObjectName("pb_remove_save")
+        self.horizontalLayout.addWidget(self.pb_remove_save)
+
+        self.retranslateUi(Form)
+        QtCore.QMetaObject.connectSlotsByName(Form)
+
+    def retranslateUi(self, Form):
+        _translate = QtCore.QCoreApplication.translate
+        Form.setWindowTitle(_translate("Form", "Form"))
+        self.label_25.setText(_translate("Form", "Save to:"))
+        self.cb_save_to.setItemText(0, _translate("Form", "Disk"))
+        self.cb_save_to.setItemText(1, _translate("Form", "Web"))
+        self.pb_add_save.setText(_translate("Form", "Add"))
+        self.pb_remove_save.setText(_translate("Form", "Remove"))
@@ -1,12 +1,14 @@
 
+import collections
+
 from PyQt5 import QtCore, QtGui, QtWidgets
-from PyQt5.uic import loadUiType
 
 from save_info.delegates import PathDelegate, TypeDelegate
 from save_info.item import Save
 from save_info.model import SaveModel
-
-Ui_SaveControlsWindow, QSaveControls = loadUiType('save_info/save_controls.ui')
+#Compiled from save_controls.ui with
+#pyuic5 save_info/save_controls.ui -o save_info/ui_save_controls.py
+from save_info.ui_save_controls import Ui_Form as Ui_SaveControlsWindow
 
 
 class SaveView(QtWidgets.QTableView):
@@ -15,7 +17,13 @@ class SaveView(QtWidgets.QTableView):
     When set to readonly-mode, the save-model can only be viewed, not
     edited. When clicking on the right column, an appropriate editor
     will be shown allowing editing of the save path. 
+
+    A single view can be reused for many models with `showModel()`,
+    which remembers the scroll position and selected row of the 
+    `STATE_CACHE_SIZE` most recently shown models. 
     """
+    STATE_CACHE_SIZE = 16
+
     def __init__(self, model=None, readonly=False, *args, **kwargs):
         """
         Initialize the SaveView instance. 
@@ -31,6 +39,7 @@ class SaveView(QtWidgets.QTableView):
         if model: 
             self.setModel(model)
         self._readonly = readonly
+        self._view_states = collections.OrderedDict()
 
         #Delegate stuff 
         self.type_delegate = td = TypeDelegate()
@@ -42,7 +51,6 @@ class SaveView(QtWidgets.QTableView):
         #Visual stuff 
         self.setVerticalScrollMode(self.ScrollPerPixel)
         self.setHorizontalScrollMode(self.ScrollPerPixel)
-        self.horizontalHeader().setSectionResizeMode(1, QtWidgets.QHeaderView.Stretch)
         self.verticalHeader().hide()
         self.setSelectionBehavior(QtWidgets.QTableView.SelectRows)
         self.setSelectionMode(self.SingleSelection)
@@ -51,7 +59,62 @@ class SaveView(QtWidgets.QTableView):
     
     def clear(self):
         """ Empty the view by removing the model """
-        self.setModel(None)
+        self.showModel(None)
+
+    def setModel(self, model):
+        #The view creates a new selection model for every model
+        selection_model = self.selectionModel()
+        super().setModel(model)
+        if selection_model is not None:
+            selection_model.deleteLater()
+        if model is not None:
+            self.horizontalHeader().setSectionResizeMode(1, QtWidgets.QHeaderView.Stretch)
+
+    def showModel(self, model):
+        """
+        Show `model` in this view, keeping the delegates and editors
+        of the view. The scroll position and selected row of the 
+        previous model are stored and restored once it is shown again. 
+
+        Parameters
+        ----------
+        model : filter_tree.save_info.model.SaveModel
+            The save model to show, or None to empty the view. 
+        """
+        current = self.model()
+        if model is current:
+            return
+        if current is not None:
+            #Commit and close any open editor before switching
+            save = self.currentSave()
+            self.setCurrentIndex(QtCore.QModelIndex())
+            self._storeViewState(current, save)
+
+        self.setModel(model)
+        if model is None:
+            return
+        model.setReadonly(readonly=self._readonly)
+        self._restoreViewState(model)
+
+    def _storeViewState(self, model, save):
+        scroll = (self.horizontalScrollBar().value(), self.verticalScrollBar().value())
+        self._view_states[model] = (save, scroll)
+        self._view_states.move_to_end(model)
+        while len(self._view_states) > self.STATE_CACHE_SIZE:
+            self._view_states.popitem(last=False)
+
+    def _restoreViewState(self, model):
+        state = self._view_states.get(model)
+        if state is None:
+            self.scrollToTop()
+            return
+        save, (h_scroll, v_scroll) = state
+        if save is not None and save in model.saves:
+            self.selectionModel().select(save.path_item.index(), 
+                QtCore.QItemSelectionModel.ClearAndSelect|QtCore.QItemSelectionModel.Rows)
+        self.executeDelayedItemsLayout()
+        self.horizontalScrollBar().setValue(h_scroll)
+        self.verticalScrollBar().setValue(v_scroll)
         
     def currentSave(self):
         """ 
@@ -73,13 +136,14 @@ class SaveView(QtWidgets.QTableView):
 
     def setReadonly(self, readonly=True): 
         self._readonly = readonly
-        self.model().setReadonly(readonly=readonly)
+        if self.model() is not None:
+            self.model().setReadonly(readonly=readonly)
 
     def isReadOnly(self):
         return self._readonly
 
 
-class SaveControls(QSaveControls, Ui_SaveControlsWindow):
+class SaveControls(QtWidgets.QWidget, Ui_SaveControlsWindow):
     """
     The SaveControls widget is a small utility widget which can
     be placed underneath a SaveView. It contains all neccessary
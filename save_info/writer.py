@@ -0,0 +1,507 @@
+import collections
+import concurrent.futures
+import hashlib
+import io
+import json
+import os
+import posixpath
+import stat
+import tempfile
+import threading
+import urllib.request
+
+import numpy as np
+from PyQt5 import QtCore, QtGui
+
+from filters.registry import toRef
+from save_info.item import Save
+
+
+class EncodedOutput:
+    """
+    An `EncodedOutput` holds the encoded bytes of an output in a
+    single format, alongside the digest of those bytes. It is created
+    once per output and format by the `SaveWriter` and shared by all
+    destinations using that format.
+    """
+    def __init__(self, fmt, extension, chunks, shape=None, dtype=None):
+        """
+        Initialize the `EncodedOutput`.
+
+        Parameters
+        ----------
+        fmt : str
+            The format name, e.g. 'png'
+        extension : str
+            The file extension (including the dot) used for disk saves
+        chunks : list
+            List of bytes-like objects which, concatenated, make up
+            the encoded output.
+        shape : tuple
+            The shape of the encoded array, after converting its bit
+            depth, or None
+        dtype : str
+            The dtype string of the encoded array, or None
+        """
+        self.format = fmt
+        self.extension = extension
+        self.chunks = chunks
+        self.shape = shape
+        self.dtype = dtype
+        self.size = sum(len(memoryview(chunk).cast('B')) for chunk in chunks)
+
+        digest = hashlib.blake2b(digest_size=20)
+        for chunk in chunks:
+            digest.update(chunk)
+        self.digest = digest.hexdigest()
+
+    def iterBlocks(self, block_size=1 << 20):
+        """ Yield the encoded output in blocks of at most `block_size` bytes. """
+        for chunk in self.chunks:
+            chunk = memoryview(chunk).cast('B')
+            for start in range(0, len(chunk), block_size):
+                yield chunk[start:start+block_size]
+
+    def writeTo(self, fp, block_size=1 << 20):
+        """ Write all chunks to the binary file-like object `fp`. """
+        for block in self.iterBlocks(block_size):
+            fp.write(block)
+
+    def toBytes(self):
+        """ Return the encoded output as a single bytes object. """
+        return b''.join(bytes(chunk) for chunk in self.chunks)
+
+
+class SaveWriter:
+    """
+    The `SaveWriter` writes outputs to the destinations of a `SaveModel`.
+
+    Each output is encoded only once per format and encoder settings
+    (see the 'compression', 'level' and 'bit_depth' properties in 
+    `Save.PROPERTIES`). The encoded buffer is hashed and the same buffer 
+    is written to every destination that uses these settings. Distinct
+    encodings are created in parallel if a save's 'encoder_threads'
+    property allows it. Disk destinations that already contain identical
+    content are skipped. The most recently used encodings are kept up to
+    a total of `max_encoded_bytes`, so that several items saving 
+    identical arrays share the encoding as well. Note that encodings of
+    'npy' saves reference the output array itself.
+
+    Disk saves using the 'npy' format are written as raw `.npy` files,
+    which can be memory-mapped using `loadOutput()`. A small `.json`
+    sidecar next to the file holds the output's provenance and can be
+    read using `loadProvenance()`.
+    """
+    #Format name: (Qt format, file extension). 'npy' isn't encoded by Qt.
+    FORMATS = {
+        'png': ('PNG', '.png'),
+        'tiff': ('TIFF', '.tif'),
+        'npy': (None, '.npy'),
+    }
+    DEFAULT_FORMAT = 'png'
+    SIDECAR_EXTENSION = '.json'
+    MAX_ENCODED_BYTES = 256 << 20
+
+    def __init__(self, max_encoded_bytes=None):
+        """
+        Initialize the `SaveWriter`.
+
+        Parameters
+        ----------
+        max_encoded_bytes : int
+            The total size of the encodings kept for reuse. If None, 
+            `MAX_ENCODED_BYTES`.
+        """
+        self.max_encoded_bytes = max_encoded_bytes if max_encoded_bytes is not None else self.MAX_ENCODED_BYTES
+        self._encoded = collections.OrderedDict()
+        self._encoded_bytes = 0
+        self._written = {}
+
+    def clear(self):
+        """ Drop all cached encoded buffers. """
+        self._encoded = collections.OrderedDict()
+        self._encoded_bytes = 0
+
+    def writeItem(self, item, only_active=True):
+        """
+        Write the output of a `FilterItem` to all of its saves.
+
+        Parameters
+        ----------
+        item : filter_tree.tree.item.FilterItem
+            The item whose output should be saved. The item's name
+            is used as the file name.
+        only_active : bool
+            If True, only active saves are written.
+
+        Returns
+        -------
+        written : list
+            List of all paths/urls that were actually written to.
+        """
+        output = item.output
+        if output is None:
+            return []
+        saves = item.save_model.getPaths(only_active=only_active)
+        name = item.name if item.name else item.id
+        return self.write(output, saves, name, provenance=self.getProvenance(item))
+
+    def write(self, array, saves, name, provenance=None):
+        """
+        Encode `array` once per required format and write it to
+        all given saves.
+
+        Parameters
+        ----------
+        array : numpy.ndarray
+            The output array to save
+        saves : list
+            List of save dicts with 'type', 'path' and 'properties'
+            entries, as returned by `SaveModel.getPaths()`
+        name : str
+            The file name (without extension) used for all saves
+        provenance : dict
+            Information on how the output was created. Written to
+            the sidecar file of 'npy' disk saves. 
+
+        Returns
+        -------
+        written : list
+            List of all paths/urls that were actually written to.
+        """
+        written = []
+        uploaded = set()
+        if len(saves) == 0:
+            return written
+
+        array = np.ascontiguousarray(array)
+        array_digest = self._arrayDigest(array)
+
+        encodings = {}
+        for save in saves:
+            properties = self._getProperties(save)
+            encodings[self._encoderKey(properties)] = properties
+        self._encodeAll(array, array_digest, encodings)
+
+        for save in saves:
+            properties = self._getProperties(save)
+            encoded = self._getEncoded(array, properties, array_digest)
+            file_name = name + encoded.extension
+            chunk_size = properties['chunk_size']
+
+            if save['type'] == 'disk':
+                target = os.path.join(save['path'], file_name)
+                if self._writeFile(target, encoded, chunk_size):
+                    written.append(target)
+                if encoded.format == 'npy':
+                    sidecar = self._encodeSidecar(encoded, provenance)
+                    self._writeFile(target + self.SIDECAR_EXTENSION, sidecar, chunk_size)
+            elif save['type'] == 'web':
+                target = posixpath.join(save['path'], file_name)
+                if target in uploaded:
+                    continue
+                self._upload(target, encoded, chunk_size, properties['timeout'])
+                uploaded.add(target)
+                written.append(target)
+            else:
+                raise ValueError("Invalid save type: {}".format(save['type']))
+        #Only trimmed now, so that all saves of this output share the encodings
+        self._trimEncoded()
+        return written
+
+    def encode(self, array, properties=None, array_digest=None):
+        """
+        Return the `EncodedOutput` of `array` using the encoder settings
+        in `properties`, encoding it only if it hasn't been encoded before.
+
+        Parameters
+        ----------
+        array : numpy.ndarray
+            The array to encode
+        properties : dict
+            The save properties, see `Save.PROPERTIES`. Only 'format', 
+            'compression', 'level' and 'bit_depth' are used. 
+        array_digest : str
+            The array's content digest, if already known
+        """
+        properties = self._getProperties({'properties': properties if properties else {}})
+        array = np.ascontiguousarray(array)
+        if array_digest is None:
+            array_digest = self._arrayDigest(array)
+        encoded = self._getEncoded(array, properties, array_digest)
+        self._trimEncoded()
+        return encoded
+
+    def _getEncoded(self, array, properties, array_digest):
+        fmt = properties['format']
+        if not fmt in self.FORMATS.keys():
+            raise ValueError("Invalid save format: {}".format(fmt))
+
+        key = (array_digest, self._encoderKey(properties))
+        if key in self._encoded.keys():
+            self._encoded.move_to_end(key)
+            return self._encoded[key]
+
+        encoded = self._encode(array, *key[1])
+        self._addEncoded(key, encoded)
+        return encoded
+
+    def _addEncoded(self, key, encoded):
+        previous = self._encoded.pop(key, None)
+        if previous is not None:
+            self._encoded_bytes -= previous.size
+        self._encoded[key] = encoded
+        self._encoded_bytes += encoded.size
+
+    def _trimEncoded(self):
+        """ Drop the least recently used encodings beyond `max_encoded_bytes`. """
+        while self._encoded_bytes > self.max_encoded_bytes and len(self._encoded) > 0:
+            key, encoded = self._encoded.popitem(last=False)
+            self._encoded_bytes -= encoded.size
+
+    def _encodeAll(self, array, array_digest, encodings):
+        """
+        Create all missing encodings of `array` in parallel, using at
+        most as many threads as the saves' 'encoder_threads' allow.
+        """
+        missing = [key for key in encodings.keys() if not (array_digest, key) in self._encoded.keys()]
+        threads = min(len(missing), max([p['encoder_threads'] for p in encodings.values()], default=1))
+        if threads < 2:
+            return
+
+        #Qt and numpy release the GIL while encoding
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = {key: executor.submit(self._encode, array, *key) for key in missing}
+        for key, future in futures.items():
+            self._addEncoded((array_digest, key), future.result())
+
+    def _encode(self, array, fmt, compression, level, bit_depth):
+        array = self._convertBitDepth(array, bit_depth)
+        qt_format, extension = self.FORMATS[fmt]
+        if fmt == 'npy':
+            if not compression in ['default', 'none']:
+                raise ValueError("npy saves cannot be compressed, got compression {}!".format(compression))
+            chunks = self._encodeNpy(array)
+        else:
+            chunks = [self._encodeImage(array, qt_format, compression, level)]
+        return EncodedOutput(fmt, extension, chunks, shape=array.shape, dtype=array.dtype.str)
+
+    def _writeFile(self, target, encoded, chunk_size=1 << 20):
+        """
+        Write `encoded` to `target` atomically, unless the target
+        already contains identical content. Return True if written.
+        """
+        if self._hasContent(target, encoded):
+            return False
+
+        directory = os.path.dirname(target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory or None, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                encoded.writeTo(fp, chunk_size)
+            #mkstemp creates the file readable by its owner only
+            os.chmod(tmp_path, fileMode(target))
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        stat = os.stat(target)
+        self._written[target] = (stat.st_size, stat.st_mtime_ns, encoded.digest)
+        return True
+
+    def _hasContent(self, target, encoded):
+        try:
+            stat = os.stat(target)
+        except FileNotFoundError:
+            return False
+        if stat.st_size != encoded.size:
+            return False
+
+        #Avoid re-reading files this writer has written itself
+        known = self._written.get(target)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2] == encoded.digest
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(target, 'rb') as fp:
+            for block in iter(lambda: fp.read(1 << 20), b''):
+                digest.update(block)
+        digest = digest.hexdigest()
+        self._written[target] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest == encoded.digest
+
+    def _upload(self, url, encoded, chunk_size, timeout):
+        request = urllib.request.Request(url, data=encoded.iterBlocks(chunk_size), method='PUT')
+        request.add_header('Content-Type', 'application/octet-stream')
+        request.add_header('Content-Length', str(encoded.size))
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+    def _getProperties(self, save):
+        """ Return the save's properties, completed by the schema defaults. """
+        save_type = save.get('type', 'web')
+        properties = {key: default for key, (_, default, _) in Save.PROPERTIES[save_type].items()}
+        properties.update(save.get('properties', {}))
+        return properties
+
+    @staticmethod
+    def _encoderKey(properties):
+        return (properties['format'], properties['compression'], properties['level'], properties['bit_depth'])
+
+    @staticmethod
+    def getProvenance(item):
+        """ Return a dict describing how the output of `item` was created. """
+        fn = toRef(item.fn, strict=False)
+        if callable(fn):
+            fn = "{}:{}".format(fn.__module__, fn.__qualname__)
+
+        tree_path = []
+        parent = item
+        while parent is not None:
+            tree_path.insert(0, parent.name)
+            parent = parent.parent()
+
+        return {
+            'id': item.id,
+            'name': item.name,
+            'full_name': item.full_name,
+            'fn': fn,
+            'tree_path': tree_path,
+            'parameters': item.param_model.getValues()
+        }
+
+    @staticmethod
+    def _encodeNpy(array):
+        # The array data is referenced, not copied, behind the header
+        if array.dtype.hasobject:
+            raise TypeError("Cannot save arrays of dtype object as npy!")
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, np.lib.format.header_data_from_array_1_0(array))
+        return [header.getvalue(), memoryview(array).cast('B')]
+
+    @staticmethod
+    def _encodeSidecar(encoded, provenance):
+        #Describes the saved array, i.e. after the bit depth conversion
+        sidecar = {
+            'shape': list(encoded.shape),
+            'dtype': encoded.dtype,
+            'digest': encoded.digest,
+            'provenance': provenance if provenance else {}
+        }
+        data = json.dumps(sidecar, indent=1, default=repr).encode()
+        return EncodedOutput('json', SaveWriter.SIDECAR_EXTENSION, [data])
+
+    @staticmethod
+    def _arrayDigest(array):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(str((array.shape, array.dtype.str)).encode())
+        digest.update(memoryview(array).cast('B'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _convertBitDepth(array, bit_depth):
+        if bit_depth == 8 and array.dtype == np.uint16:
+            return (array >> 8).astype(np.uint8)
+        elif bit_depth == 16 and array.dtype == np.uint8:
+            return array.astype(np.uint16) * 257
+        return array
+
+    @staticmethod
+    def _encodeImage(array, qt_format, compression='default', level=-1):
+        if array.ndim == 2 and array.dtype == np.uint8:
+            image_format = QtGui.QImage.Format_Grayscale8
+        elif array.ndim == 2 and array.dtype == np.uint16:
+            image_format = QtGui.QImage.Format_Grayscale16
+        elif array.ndim == 3 and array.shape[2] == 3 and array.dtype == np.uint8:
+            image_format = QtGui.QImage.Format_RGB888
+        elif array.ndim == 3 and array.shape[2] == 4 and array.dtype == np.uint8:
+            image_format = QtGui.QImage.Format_RGBA8888
+        else:
+            raise TypeError("Cannot encode array of shape {} and dtype {} as image!".format(array.shape, array.dtype))
+
+        height, width = array.shape[:2]
+        image = QtGui.QImage(array.data, width, height, array.strides[0], image_format)
+
+        buffer = QtCore.QBuffer()
+        buffer.open(QtCore.QIODevice.WriteOnly)
+        writer = QtGui.QImageWriter(buffer, qt_format.encode())
+        if qt_format == 'PNG':
+            if compression == 'none':
+                level = 0
+            elif not compression in ['default', 'deflate']:
+                raise ValueError("Invalid compression for png saves: {}".format(compression))
+            if level >= 0:
+                #Qt maps the quality 0-100 onto the zlib levels 9-0
+                writer.setQuality(100 - (level * 91 + 8) // 9)
+        elif qt_format == 'TIFF':
+            if compression in ['default', 'none']:
+                writer.setCompression(0)
+            elif compression == 'lzw':
+                writer.setCompression(1)
+            else:
+                raise ValueError("Invalid compression for tiff saves: {}".format(compression))
+
+        if not writer.write(image):
+            raise IOError("Encoding output as {} failed: {}".format(qt_format, writer.errorString()))
+        return bytes(buffer.data())
+
+
+def fileMode(path):
+    """
+    Return the permission bits for a file replacing `path`: those of
+    the existing file, or the default for new files given the umask.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_getUmask()
+
+
+_umask = None
+_umask_lock = threading.Lock()
+
+def _getUmask():
+    #The umask can only be read by setting it, so it is read only once
+    global _umask
+    with _umask_lock:
+        if _umask is None:
+            _umask = os.umask(0o022)
+            os.umask(_umask)
+        return _umask
+
+
+def loadOutput(path, mmap=True):
+    """
+    Load an output written by a 'npy' disk save.
+
+    Parameters
+    ----------
+    path : str
+        Path of the `.npy` file
+    mmap : bool
+        If True, the file is memory-mapped read-only instead of
+        being loaded into memory.
+
+    Returns
+    -------
+    array : numpy.ndarray
+        The output array (a `numpy.memmap` if `mmap` is True)
+    """
+    return np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+
+
+def loadProvenance(path):
+    """
+    Return the sidecar dict of an output written by a 'npy' disk save,
+    containing the 'shape', 'dtype', 'digest' and 'provenance' entries.
+    Returns None if no sidecar exists.
+    """
+    sidecar_path = path + SaveWriter.SIDECAR_EXTENSION
+    if not os.path.exists(sidecar_path):
+        return None
+    with open(sidecar_path, 'r') as fp:
+        return json.load(fp)
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+#The packages of the repository are imported by their top level names
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def app():
+    from PyQt5 import QtWidgets
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    yield app
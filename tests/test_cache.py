@@ -0,0 +1,28 @@
+import os
+from unittest import mock
+
+import numpy as np
+
+from processing.cache import ResultCache
+
+
+KEY = 'ab' * 20
+
+
+def test_failed_touch_keeps_entry(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put(KEY, np.arange(5))
+    with mock.patch('os.utime', side_effect=PermissionError(1, "Operation not permitted")):
+        assert np.array_equal(cache.get(KEY), np.arange(5))
+        cache.put(KEY, np.arange(5))
+    assert os.path.exists(cache.path(KEY))
+
+
+def test_undecodable_entry_is_removed(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    path = cache.path(KEY)
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as fp:
+        fp.write(b'\x93NUMPY truncated')
+    assert cache.get(KEY) is None
+    assert not os.path.exists(path)
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from filters import declareCapabilities
+from processing import Executor, PlanCompiler, ProcessExecutor
+from tree.model import FilterModel
+
+
+def white(size=8):
+    return np.full((size, size), 255, dtype=np.uint8)
+
+
+@declareCapabilities(thread_safe=True, releases_gil=True)
+def cropRows(image, border=2):
+    return image[border:-border]
+
+
+@declareCapabilities(thread_safe=True, releases_gil=True)
+def cropRowsCopy(image, border=2):
+    return image[border:-border].copy()
+
+
+@declareCapabilities(thread_safe=True, releases_gil=True, in_place=True)
+def invert(image, context=None):
+    out = context.empty_like(image)
+    np.subtract(255, image, out=out)
+    return out
+
+
+def cropAndInvert(crop_fn):
+    return [
+        {'type': 'input', 'name': 'in', 'fn': 'test_executor:white'},
+        {'type': 'filter', 'name': 'crop', 'fn': crop_fn},
+        {'type': 'filter', 'name': 'inv', 'fn': 'test_executor:invert'},
+    ]
+
+
+def createModel(items_list):
+    model = FilterModel()
+    model.loadItems(items_list)
+    return model
+
+
+@pytest.mark.parametrize('executor_cls', [Executor, ProcessExecutor])
+def test_view_of_input_isnt_donated(executor_cls):
+    model = createModel(cropAndInvert('test_executor:cropRows'))
+    source, crop, inv = model.topLevelItems()
+    compiler = PlanCompiler(model)
+    executor = executor_cls()
+    try:
+        for run in range(2):
+            results, errors = executor.run(compiler.compile())
+            assert errors == {}
+            assert np.all(source.output == 255)
+            assert np.all(crop.output == 255)
+            assert np.all(inv.output == 0)
+    finally:
+        if executor_cls is ProcessExecutor:
+            executor.shutdown()
+
+
+@pytest.mark.parametrize('executor_cls', [Executor, ProcessExecutor])
+def test_owned_result_is_donated(executor_cls):
+    model = createModel(cropAndInvert('test_executor:cropRowsCopy'))
+    source, crop, inv = model.topLevelItems()
+    executor = executor_cls()
+    try:
+        results, errors = executor.run(PlanCompiler(model).compile())
+    finally:
+        if executor_cls is ProcessExecutor:
+            executor.shutdown()
+    assert errors == {}
+    #The donated result was overwritten, so its item gets no output
+    assert crop.output is None
+    assert np.all(source.output == 255)
+    assert np.all(inv.output == 0)
+
+
+@pytest.mark.parametrize('fn', ['no_such_filter', 'test_executor:'])
+def test_invalid_function_only_fails_its_branch(fn):
+    model = createModel([
+        {'type': 'input', 'name': 'in', 'fn': 'test_executor:white'},
+        {'type': 'modifier', 'name': 'mod', 'children': [
+            {'type': 'filter', 'name': 'inv', 'fn': 'test_executor:invert'},
+            {'type': 'filter', 'name': 'bad', 'fn': fn},
+        ]},
+    ])
+    source, modifier = model.topLevelItems()
+    inv, bad = modifier.children()
+    plan = PlanCompiler(model).compile()
+    results, errors = Executor().run(plan)
+    indices = {node.name: node.index for node in plan}
+    assert "Invalid function of item bad" in errors[indices['bad']]
+    assert errors[indices['mod']] == "Upstream item failed"
+    assert not indices['inv'] in errors.keys()
+    assert np.all(inv.output == 0)
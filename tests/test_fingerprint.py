@@ -0,0 +1,28 @@
+import os
+import shutil
+
+from processing.fingerprint import Fingerprinter
+
+
+def writeFile(path, content, mtime_ns):
+    with open(path, 'wb') as fp:
+        fp.write(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def test_small_files_are_hashed_entirely(tmp_path):
+    fingerprinter = Fingerprinter(sample_size=16, samples=2, full_hash_size=1 << 10)
+    a = writeFile(tmp_path / 'a', b'a' * 512, 10**18)
+    b = writeFile(tmp_path / 'b', b'a' * 256 + b'b' + b'a' * 255, 10**18)
+    copy = str(tmp_path / 'copy')
+    shutil.copy2(a, copy)
+    assert fingerprinter.fingerprint(a) != fingerprinter.fingerprint(b)
+    assert fingerprinter.fingerprint(a) == fingerprinter.fingerprint(copy)
+
+
+def test_large_files_differing_between_samples(tmp_path):
+    fingerprinter = Fingerprinter(sample_size=16, samples=2, full_hash_size=1 << 10)
+    a = writeFile(tmp_path / 'a', b'a' * 4096, 10**18)
+    b = writeFile(tmp_path / 'b', b'a' * 2048 + b'b' + b'a' * 2047, 10**18)
+    assert fingerprinter.fingerprint(a) != fingerprinter.fingerprint(b)
@@ -0,0 +1,86 @@
+import logging
+import time
+
+
+logger = logging.getLogger('filter_tree.tracing')
+
+_callbacks = []
+
+
+def addCallback(callback):
+    """
+    Register `callback` to be called for every traced event as
+    `callback(event, subject, duration)`, where `event` is the event 
+    name (e.g. 'item.create'), `subject` the object the event concerns
+    and `duration` the time it took in seconds. 
+    """
+    if not callback in _callbacks:
+        _callbacks.append(callback)
+
+
+def removeCallback(callback):
+    """ Unregister a callback added with `addCallback()`. """
+    if callback in _callbacks:
+        _callbacks.remove(callback)
+
+
+def isEnabled():
+    """ 
+    Return True if events are recorded, i.e. if any callback is 
+    registered or the 'filter_tree.tracing' logger handles DEBUG. 
+    """
+    return len(_callbacks) > 0 or logger.isEnabledFor(logging.DEBUG)
+
+
+def span(event, subject=None):
+    """
+    Return a context manager timing the event `event`. The subject 
+    may also be set later through the `subject` attribute of the 
+    returned object, e.g. once it has been created:
+
+        with tracing.span('item.create') as s:
+            obj = ...
+            s.subject = obj
+
+    When tracing is disabled, a shared no-op object is returned, so
+    neither timing nor formatting costs anything. 
+    """
+    if not isEnabled():
+        return _NULL_SPAN
+    return _Span(event, subject)
+
+
+class _Span:
+    def __init__(self, event, subject):
+        self.event = event
+        self.subject = subject
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            logger.debug("%s failed after %.3f ms: %r", self.event, duration*1000, exc_value)
+            return False
+        #Lazy formatting: the subject is only repr'd if the record is emitted
+        logger.debug("%s took %.3f ms: %r", self.event, duration*1000, self.subject)
+        for callback in list(_callbacks):
+            callback(self.event, self.subject, duration)
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
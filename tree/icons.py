@@ -0,0 +1,77 @@
+import os
+
+from PyQt5 import QtGui
+
+try:
+    #Optional Qt resource bundle, compiled with
+    #pyrcc5 resources/resources.qrc -o tree/resources_rc.py
+    import tree.resources_rc
+except ImportError:
+    _HAS_BUNDLE = False
+else:
+    _HAS_BUNDLE = True
+
+
+RESOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources')
+RESOURCE_PREFIX = ':/resources'
+
+ICON_FILES = {
+    'filter': 'filter.png',
+    'filter_new': 'filter_new.png',
+    'modifier': 'modifier.png',
+    'modifier_new': 'modifier_new.png',
+    'folder': 'folder.png',
+    'folder_new': 'folder_new.png',
+    'input': 'input.png',
+    'input_new': 'input_new.png',
+    'delete': 'delete.png',
+}
+
+_icons = {}
+
+
+def getIcon(name):
+    """
+    Return the icon registered as `name` in `ICON_FILES`. Each icon
+    is loaded only once, from the compiled resource bundle if it is
+    available and from the resources directory otherwise. 
+
+    Parameters
+    ----------
+    name : str
+        The icon name, e.g. 'filter' or 'folder_new'. None returns 
+        an empty icon, as does any name when there is no 
+        `QGuiApplication`. 
+
+    Returns
+    -------
+    icon : QtGui.QIcon
+        The shared icon instance
+    """
+    if QtGui.QGuiApplication.instance() is None:
+        #Icons can't be created without an application, e.g. in workers
+        return QtGui.QIcon()
+
+    icon = _icons.get(name)
+    if icon is None:
+        if name is None:
+            icon = QtGui.QIcon()
+        elif not name in ICON_FILES.keys():
+            raise KeyError("Unknown icon: {}".format(name))
+        else:
+            icon = QtGui.QIcon(getIconPath(name))
+        _icons[name] = icon
+    return icon
+
+
+def getIconPath(name):
+    """ Return the path the icon `name` is loaded from. """
+    if _HAS_BUNDLE:
+        return RESOURCE_PREFIX + '/' + ICON_FILES[name]
+    else:
+        return os.path.join(RESOURCE_DIR, ICON_FILES[name])
+
+
+def clearIcons():
+    """ Drop all loaded icons. """
+    _icons.clear()
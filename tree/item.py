@@ -1,11 +1,21 @@
 
-import time
+import hashlib
+import itertools
+import threading
+import uuid
 from collections.abc import MutableMapping
 
-from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5 import QtCore, QtGui
 
+import tracing
+from filters.registry import toRef
 from parameters import ParameterModel
 from save_info import SaveModel
+from tree.icons import getIcon
+
+_ID_PREFIX = uuid.uuid4().hex[:12]
+_id_counter = itertools.count()
+_id_lock = threading.Lock()
 
 
 class FilterItem(QtGui.QStandardItem):
@@ -33,6 +43,13 @@ class FilterItem(QtGui.QStandardItem):
     TYPE_INPUT = QtGui.QStandardItem.UserType + 40
     TYPE_OUTPUT = QtGui.QStandardItem.UserType + 50
 
+    TYPE_ICONS = {
+        TYPE_FILTER: 'filter',
+        TYPE_MODIFIER: 'modifier',
+        TYPE_GROUP: 'folder',
+        TYPE_INPUT: 'input',
+    }
+
     #DATA ROLE constants: use with setData(value, role) or data(role)
     ROLE_TYPE = QtCore.Qt.UserRole + 100
     ROLE_NAME = QtCore.Qt.UserRole + 200
@@ -52,29 +69,20 @@ class FilterItem(QtGui.QStandardItem):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        print("initializing item")
-        self.type = self.TYPE_GENERIC
-        self.name = ""
-        self.full_name = ""
-        self.description = ""
-        self.is_active = True
-        self.is_processed = False
-        self.has_processing_error = False
-        self.status_message = "Not processed"
-        self.output = None
-        self.fn = None
-        print("creating param_model")
-        param_model = ParameterModel.createModel()
-        print("param_model", param_model)
-        self.param_model = param_model
-        print("param_model", self.param_model)
-        self.save_model = SaveModel.createModel()
-        print("save_model", self.save_model)
-        self.id = str(time.time()) #Item id is the current time, converted to string. This ensures uniqueness
-        print("initializing item done")
-        
-        
-        print("self",self)
+        with tracing.span('item.init', self):
+            self.type = self.TYPE_GENERIC
+            self.name = ""
+            self.full_name = ""
+            self.description = ""
+            self.is_active = True
+            self.is_processed = False
+            self.has_processing_error = False
+            self.status_message = "Not processed"
+            self.output = None
+            self.fn = None
+            self.param_model = ParameterModel.createModel()
+            self.save_model = SaveModel.createModel()
+            self.id = self.newId()
 
     def __getattribute__(self, name):
         if name == 'type':
@@ -131,8 +139,11 @@ class FilterItem(QtGui.QStandardItem):
         elif name == 'fn':
             self.setData(value, self.ROLE_FN)
         elif name == 'param_model':
+            #QObjects are stored as plain pointers, so keep them alive here
+            super().__setattr__('_param_model', value)
             self.setData(value, self.ROLE_PARAM_MODEL)
         elif name == 'save_model':
+            super().__setattr__('_save_model', value)
             self.setData(value, self.ROLE_SAVE_MODEL)
         elif name == 'id':
             self.setData(value, self.ROLE_ID)
@@ -171,104 +182,115 @@ class FilterItem(QtGui.QStandardItem):
         for child_i in range(self.rowCount()):
             yield self.child(child_i)
 
+    @classmethod
+    def newId(cls):
+        """
+        Return a new item id. Ids consist of a random prefix drawn once
+        per process and a counter, so they are unique within the 
+        process and won't collide with ids created by other processes.
+        """
+        with _id_lock:
+            return "{}-{}".format(_ID_PREFIX, next(_id_counter))
+
+    def pathId(self):
+        """
+        Return an id derived from the item's position in the tree,
+        i.e. the rows and names of the item and all its parents. Unlike
+        `id`, it is the same for the same tree in every session, but it
+        changes whenever the item or one of its parents is moved or 
+        renamed. 
+        """
+        path = []
+        item = self
+        while item is not None:
+            path.insert(0, "{}:{}".format(item.row(), item.name))
+            item = item.parent()
+        return hashlib.blake2b("/".join(path).encode('utf-8'), digest_size=8).hexdigest()
+
     def clone(self, keep_output=False, keep_children='all', keep_children_output=False):
-        print("starting clone")
-        obj = FilterItem.createItem(self.serialize(include_children=False))
-        if keep_output:
-            obj.output = self.output
-            print("cloned output")
-        if keep_children == 'all':
-            for child in self.children():
-                obj.appendChild(
-                    child.clone(
-                        keep_output=keep_children_output, 
-                        keep_children='all', 
-                        keep_children_output=keep_children_output
+        with tracing.span('item.clone') as span:
+            obj = FilterItem.createItem(self.serialize(include_children=False))
+            if keep_output:
+                obj.output = self.output
+            if keep_children == 'all':
+                for child in self.children():
+                    obj.appendChild(
+                        child.clone(
+                            keep_output=keep_children_output, 
+                            keep_children='all', 
+                            keep_children_output=keep_children_output
+                        )
                     )
-                )
-        elif keep_children == 'first':
-            for child in self.children():
-                obj.appendChild(
-                    child.clone(
-                        keep_output=keep_children_output,
-                        keep_children='none'
+            elif keep_children == 'first':
+                for child in self.children():
+                    obj.appendChild(
+                        child.clone(
+                            keep_output=keep_children_output,
+                            keep_children='none'
+                        )
                     )
-                )
-        
-        print("returning clone",obj)
+            span.subject = obj
         return obj
 
     def serialize(self, include_children=True):
-        retval = {
-            'type': self.type,
-            'name': self.name,
-            'full_name': self.full_name,
-            'description': self.description,
-            'is_active': self.is_active,
-            'fn': self.fn,
-            'param_model': self.param_model.serialize(),
-            'save_model': self.save_model.serialize()
-        } 
-        if include_children:
-            retval['children'] = [child.serialize() for child in self.children()]
+        with tracing.span('item.serialize') as span:
+            retval = {
+                'type': self.type,
+                'name': self.name,
+                'full_name': self.full_name,
+                'description': self.description,
+                'is_active': self.is_active,
+                'fn': toRef(self.fn, strict=False),
+                'param_model': self.param_model.serialize(),
+                'save_model': self.save_model.serialize()
+            } 
+            if include_children:
+                retval['children'] = [child.serialize() for child in self.children()]
+            span.subject = retval['name']
         return retval
 
     def _getIcon(self):
-
-        if self.type == self.TYPE_FILTER:
-            return QtGui.QIcon('resources/filter.png')
-        elif self.type == self.TYPE_MODIFIER:
-            return QtGui.QIcon('resources/modifier.png')
-        elif self.type == self.TYPE_GROUP:
-            return QtGui.QIcon('resources/folder.png')
-        elif self.type == self.TYPE_INPUT:
-            return QtGui.QIcon('resources/input.png')
-        elif self.type == self.TYPE_OUTPUT:
-            return QtGui.QIcon()
-        else:
-            return QtGui.QIcon()
+        return getIcon(self.TYPE_ICONS.get(self.type))
 
     @classmethod
     def createItem(cls, item_dict):
         if not isinstance(item_dict, MutableMapping):
             raise TypeError("Items must be passed as dict-like objects, not as {}!".format(type(item_dict)))
         
-        keys = item_dict.keys()
-        print("creating item")
-        obj = cls()
-        print("created item1",obj)
+        with tracing.span('item.create') as span:
+            keys = item_dict.keys()
+            obj = cls()
 
-        #Check required arguments
-        if 'type' in keys:
-            obj.type = cls._fixupType(item_dict['type'])
-        else:
-            raise KeyError("Could not find 'type' in item dictionary!")
-        if 'name' in keys:
-            obj.name = name = item_dict['name']
-        else: 
-            raise KeyError("Could not find 'name' in item dictionary!")
-
-        #Check optional arguments
-        obj.full_name = item_dict['full_name'] if 'full_name' in keys else name
-        obj.description = item_dict['description'] if 'description' in keys else ''
-        obj.is_active = item_dict['is_ative'] if 'is_ative' in keys else True
-        obj.fn = item_dict['fn'] if 'fn' in keys else None
-        if 'param_model' in keys:
-            obj.param_model = ParameterModel.createModel(params=item_dict['param_model'])
-        else:
-            obj.param_model = ParameterModel.createModel()
-        if 'save_model' in keys:
-            obj.save_model = SaveModel.createModel(saves_list=item_dict['save_model']) 
-        else:
-            obj.save_model = SaveModel.createModel()
-        if 'children' in keys:
-            children = item_dict['children']
-            if not isinstance(children, list):
-                raise TypeError("Children must be passed in list, not {}".format(type(children)))
-            for child in children: 
-                obj.appendRow(FilterItem.createItem(child))
+            #Check required arguments
+            if 'type' in keys:
+                obj.type = cls._fixupType(item_dict['type'])
+            else:
+                raise KeyError("Could not find 'type' in item dictionary!")
+            if 'name' in keys:
+                obj.name = name = item_dict['name']
+            else: 
+                raise KeyError("Could not find 'name' in item dictionary!")
 
-        print("created item20",obj)
+            #Check optional arguments
+            obj.full_name = item_dict['full_name'] if 'full_name' in keys else name
+            obj.description = item_dict['description'] if 'description' in keys else ''
+            obj.is_active = item_dict['is_active'] if 'is_active' in keys else True
+            obj.fn = item_dict['fn'] if 'fn' in keys else None
+            if 'param_model' in keys:
+                obj.param_model = ParameterModel.createModel(params=item_dict['param_model'])
+            else:
+                obj.param_model = ParameterModel.createModel()
+            if 'save_model' in keys:
+                obj.save_model = SaveModel.createModel(saves_list=item_dict['save_model']) 
+            else:
+                obj.save_model = SaveModel.createModel()
+            if 'children' in keys:
+                children = item_dict['children']
+                if not isinstance(children, list):
+                    raise TypeError("Children must be passed in list, not {}".format(type(children)))
+                for child in children: 
+                    obj.appendRow(FilterItem.createItem(child))
+            span.subject = obj
         return obj
 
     @classmethod
@@ -294,6 +316,35 @@ class FilterItem(QtGui.QStandardItem):
         else:
             raise TypeError("Item type must be passed either as int or string!")
 
+    def __reduce__(self):
+        #Items are pickled in serialized form, with their function as
+        #import path. Outputs are copied into the pickle; to send them
+        #through shared memory use `processing.transport.dumpsShared()`
+        return (FilterItem._fromTransport, (self._getTransportState(),))
+
+    def _getTransportState(self):
+        return {
+            'item': self.serialize(include_children=False),
+            'id': self.id,
+            'output': self.output,
+            'is_processed': self.is_processed,
+            'has_processing_error': self.has_processing_error,
+            'status_message': self.status_message,
+            'children': [child._getTransportState() for child in self.children()],
+        }
+
+    @classmethod
+    def _fromTransport(cls, state):
+        obj = cls.createItem(state['item'])
+        obj.id = state['id']
+        obj.output = state['output']
+        obj.is_processed = state['is_processed']
+        obj.has_processing_error = state['has_processing_error']
+        obj.status_message = state['status_message']
+        for child_state in state['children']:
+            obj.appendRow(cls._fromTransport(child_state))
+        return obj
+
     def __repr__(self):
         return str(self.serialize())
 
@@ -1,13 +1,286 @@
+import contextlib
 
-from PyQt5 import QtCore, QtWidgets, QtGui
+from PyQt5 import QtCore, QtGui
+
+from tree.item import FilterItem
 
 
 class FilterModel(QtGui.QStandardItemModel):
+    """
+    The `FilterModel` holds the tree of `FilterItems`. 
+
+    Signals
+    -------
+    signal_structure_changed:
+        Emitted when items are inserted, removed or moved, or when
+        an item's type or active status changes. Everything that 
+        depends on the tree's structure only (e.g. the compiled
+        execution plan) must be recreated when this is emitted.
+    signal_parameters_changed:
+        Emitted when a parameter of any item in the model changes.
+
+    Items can be looked up by their id with `itemFromId()`. The id 
+    index is updated incrementally as rows are inserted or removed and 
+    ids change.
+
+    The model also keeps the items in execution order, i.e. children
+    before their parents, so that `getItemRank()`, `getNext()`, 
+    `getPrev()` and `getEnclosingModifier()` are constant time lookups.
+    The order is rebuilt lazily on the first lookup after 
+    `signal_structure_changed`, which takes one pass over all items. 
+    It isn't patched per change, since inserting, removing or toggling
+    a single item shifts the ranks of all items after it anyway. 
+
+    Wrap bulk changes in `batchUpdate()` (or `beginUpdate()` and 
+    `endUpdate()`), e.g. when loading a tree with `loadItems()`, to
+    emit each signal once at the end instead of once per change. 
+    """
+    signal_structure_changed = QtCore.pyqtSignal()
+    signal_parameters_changed = QtCore.pyqtSignal()
+
+    STRUCTURE_ROLES = [FilterItem.ROLE_TYPE, FilterItem.ROLE_IS_ACTIVE]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._items_by_id = {}
+        #Keyed by id(item), items aren't hashable
+        self._ids_by_item = {}
+        self._order = None
+        self._update_depth = 0
+        self._update_changes = set()
+
+        self.rowsInserted.connect(self._onStructureChange)
+        self.rowsRemoved.connect(self._onStructureChange)
+        self.rowsMoved.connect(self._onStructureChange)
+        self.modelReset.connect(self._onStructureChange)
+        self.layoutChanged.connect(self._onStructureChange)
+        self.dataChanged.connect(self._onDataChange)
+        self.rowsInserted.connect(self._onRowsInserted)
+        self.rowsAboutToBeRemoved.connect(self._onRowsAboutToBeRemoved)
+        self.modelReset.connect(self._rebuildIdIndex)
+        self.signal_structure_changed.connect(self._invalidateOrder)
+
+    def topLevelItems(self):
+        """ Return iterable of all top level items. """
+        root = self.invisibleRootItem()
+        for row in range(root.rowCount()):
+            yield root.child(row)
+
+    def loadItems(self, items_list, parent=None):
+        """
+        Create items from their serial representations and append them
+        to `parent`, or to the top level if None, in a single update.
+
+        Parameters
+        ----------
+        items_list : list
+            List of serial representations of `FilterItems`, see 
+            `FilterItem.createItem()`.
+        parent : filter_tree.tree.item.FilterItem
+            The item to append the items to.
+
+        Returns
+        -------
+        items : list
+            The newly created `FilterItems`.
+        """
+        items = [FilterItem.createItem(item_dict) for item_dict in items_list]
+        with self.batchUpdate():
+            for item in items:
+                if parent is None:
+                    self.appendRow(item)
+                else:
+                    parent.appendChild(item)
+        return items
+
+    def beginUpdate(self):
+        """ 
+        Start a bulk update. Until the matching `endUpdate()`, 
+        `signal_structure_changed` and `signal_parameters_changed` 
+        aren't emitted. Calls can be nested. 
+        """
+        self._update_depth += 1
+
+    def endUpdate(self):
+        """ 
+        End a bulk update, emitting `signal_structure_changed` and 
+        `signal_parameters_changed` once if they were suppressed during
+        the update. 
+        """
+        if self._update_depth == 0:
+            raise RuntimeError("endUpdate() called without beginUpdate()!")
+        self._update_depth -= 1
+        if self._update_depth > 0:
+            return
+        changes, self._update_changes = self._update_changes, set()
+        if 'structure' in changes:
+            self.signal_structure_changed.emit()
+        if 'parameters' in changes:
+            self.signal_parameters_changed.emit()
+
+    def isUpdating(self):
+        return self._update_depth > 0
+
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """ Context manager wrapping `beginUpdate()` and `endUpdate()`. """
+        self.beginUpdate()
+        try:
+            yield self
+        finally:
+            self.endUpdate()
+
+    def itemFromId(self, id_):
+        """ 
+        Return the item with the id `id_` or None if there is no such 
+        item in the model. 
+        """
+        return self._items_by_id.get(id_)
+
+    def getItemRank(self, item):
+        """ Return the position of `item` in execution order. """
+        return self._getOrder()['ranks'][item.id]
+
+    def getNext(self, item, ignore_active_status=False):
+        """
+        Return the item executed after `item` or None if `item` is the
+        last one. Inactive items are skipped unless `ignore_active_status`
+        is True. 
+        """
+        items, rank = self._getRank(item, ignore_active_status)
+        if rank + 1 >= len(items):
+            return None
+        return items[rank + 1]
+
+    def getPrev(self, item, ignore_active_status=False):
+        """
+        Return the item executed before `item` or None if `item` is the
+        first one. Inactive items are skipped unless `ignore_active_status`
+        is True. 
+        """
+        items, rank = self._getRank(item, ignore_active_status, before=True)
+        if rank <= 0:
+            return None
+        return items[rank - 1]
+
+    def getEnclosingModifier(self, item):
+        """ Return the closest modifier containing `item` or None. """
+        return self._getOrder()['modifiers'].get(item.id)
+
+    def _getRank(self, item, ignore_active_status, before=False):
+        """ Return the list of items to navigate and the rank of `item` in it. """
+        order = self._getOrder()
+        if ignore_active_status:
+            return order['items'], order['ranks'][item.id]
+        elif item.id in order['active_ranks'].keys():
+            return order['active_items'], order['active_ranks'][item.id]
+        else:
+            #Inactive items are placed between their active neighbours
+            return order['active_items'], order['active_before'][item.id] + (1 if before else 0)
+
+    def _getOrder(self):
+        if self._order is None:
+            self._order = self._buildOrder()
+        return self._order
+
+    def _buildOrder(self):
+        items, active_items = [], []
+        modifiers, active_before = {}, {}
+
+        def visit(item, modifier):
+            child_modifier = item if item.type == FilterItem.TYPE_MODIFIER else modifier
+            for child in item.children():
+                visit(child, child_modifier)
+            if modifier is not None:
+                modifiers[item.id] = modifier
+            items.append(item)
+            if item.is_active:
+                active_items.append(item)
+            else:
+                active_before[item.id] = len(active_items) - 1
+
+        for item in self.topLevelItems():
+            visit(item, None)
+
+        return {
+            'items': items,
+            'ranks': {item.id: rank for rank, item in enumerate(items)},
+            'active_items': active_items,
+            'active_ranks': {item.id: rank for rank, item in enumerate(active_items)},
+            'active_before': active_before,
+            'modifiers': modifiers,
+        }
+
+    def _invalidateOrder(self):
+        self._order = None
+
+    def _rebuildIdIndex(self):
+        self._items_by_id = {}
+        self._ids_by_item = {}
+        root = self.invisibleRootItem()
+        for item in self._iterateRows(QtCore.QModelIndex(), 0, root.rowCount()-1):
+            self._addToIdIndex(item)
+
+    def _addToIdIndex(self, item):
+        id_ = item.id
+        self._items_by_id[id_] = item
+        self._ids_by_item[id(item)] = id_
+
+    def _removeFromIdIndex(self, item):
+        id_ = self._ids_by_item.pop(id(item), None)
+        if self._items_by_id.get(id_) is item:
+            del self._items_by_id[id_]
+
+    def _onStructureChange(self, *args):
+        if self.isUpdating():
+            #Lookups during the update must still see the new structure
+            self._invalidateOrder()
+            self._update_changes.add('structure')
+        else:
+            self.signal_structure_changed.emit()
+
+    def _onParametersChange(self):
+        if self.isUpdating():
+            self._update_changes.add('parameters')
+        else:
+            self.signal_parameters_changed.emit()
+
+    def _onDataChange(self, top_left, bottom_right, roles=[]):
+        if len(roles) == 0 or any(role in self.STRUCTURE_ROLES for role in roles):
+            self._onStructureChange()
+        if len(roles) == 0 or FilterItem.ROLE_ID in roles:
+            #Only the changed items' ids change, not their children's
+            parent = top_left.parent()
+            for row in range(top_left.row(), bottom_right.row()+1):
+                item = self.itemFromIndex(self.index(row, 0, parent))
+                if item is not None and self._ids_by_item.get(id(item)) != item.id:
+                    self._removeFromIdIndex(item)
+                    self._addToIdIndex(item)
+
+    def _onRowsInserted(self, parent, first, last):
+        for item in self._iterateRows(parent, first, last):
+            item.param_model.signal_model_change.connect(self._onParametersChange)
+            self._addToIdIndex(item)
+
+    def _onRowsAboutToBeRemoved(self, parent, first, last):
+        for item in self._iterateRows(parent, first, last):
+            try:
+                item.param_model.signal_model_change.disconnect(self._onParametersChange)
+            except TypeError:
+                pass
+            self._removeFromIdIndex(item)
+
+    def _iterateRows(self, parent, first, last):
+        """ Yield all items in the given rows and all their children. """
+        parent_item = self.itemFromIndex(parent) if parent.isValid() else self.invisibleRootItem()
+        def iterateChildren(item):
+            yield item
+            for row in range(item.rowCount()):
+                yield from iterateChildren(item.child(row))
+        for row in range(first, last+1):
+            yield from iterateChildren(parent_item.child(row))
         
     @classmethod
     def toInstance(cls, obj):
         pass 
-    
\ No newline at end of file
+    